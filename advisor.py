@@ -0,0 +1,416 @@
+"""
+Advisor pipeline pieces that don't depend on Streamlit, shared by chatbot.py and the offline tools.
+"""
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import NamedTuple, Optional, Tuple
+
+import advisor_metrics
+from llm_cache import fingerprint, normalize_prompt
+from prompt_compiler import PromptTemplate, encode_levels
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gemini-1.5-flash"
+
+# Offline mode backed by fake_gemini.py, for local runs and load tests
+USE_FAKE_LLM = os.getenv("ADVISOR_FAKE_LLM") == "1"
+
+# Ask Gemini for a bare JSON payload instead of free text
+JSON_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+EXPERIENCE_LEVELS = ["Complete Beginner", "Beginner", "Intermediate", "Advanced"]
+KNOWLEDGE_LEVELS = ["No Knowledge", "Basic", "Intermediate", "Advanced", "Expert"]
+
+# Computer Science fields and their subtopics
+CS_FIELDS = {
+    "Artificial Intelligence": {
+        "description": "Learn to build intelligent systems that can perform tasks that typically require human intelligence",
+        "topics": ["Neural Networks", "Natural Language Processing", "Computer Vision", "Reinforcement Learning", "Expert Systems", "AI Ethics"],
+        "prerequisites": ["Python", "Mathematics", "Statistics"]
+    },
+    "Data Science": {
+        "description": "Extract insights and knowledge from structured and unstructured data",
+        "topics": ["Data Analysis", "Statistical Modeling", "Data Visualization", "Big Data", "Business Intelligence", "Predictive Analytics"],
+        "prerequisites": ["Python/R", "Statistics", "SQL", "Mathematics"]
+    },
+    "Machine Learning": {
+        "description": "Build systems that automatically learn and improve from experience",
+        "topics": ["Supervised Learning", "Unsupervised Learning", "Deep Learning", "Feature Engineering", "Model Deployment", "MLOps"],
+        "prerequisites": ["Python", "Mathematics", "Statistics", "Linear Algebra"]
+    },
+    "Web Development": {
+        "description": "Create dynamic websites and web applications",
+        "topics": ["Frontend Development", "Backend Development", "Databases", "API Development", "Web Security", "Cloud Deployment"],
+        "prerequisites": ["HTML", "CSS", "JavaScript"]
+    },
+    "Mobile Development": {
+        "description": "Build applications for mobile devices",
+        "topics": ["iOS Development", "Android Development", "Cross-platform Development", "UI/UX Design", "Mobile Security", "App Store Optimization"],
+        "prerequisites": ["Programming Fundamentals", "Object-Oriented Programming"]
+    },
+    "Cybersecurity": {
+        "description": "Protect systems, networks, and data from digital attacks",
+        "topics": ["Network Security", "Ethical Hacking", "Cryptography", "Incident Response", "Security Compliance", "Risk Assessment"],
+        "prerequisites": ["Networking", "Operating Systems", "Programming"]
+    },
+    "Cloud Computing": {
+        "description": "Design and manage scalable cloud-based solutions",
+        "topics": ["AWS/Azure/GCP", "Containerization", "Microservices", "Serverless Computing", "Cloud Security", "Cost Optimization"],
+        "prerequisites": ["Networking", "Operating Systems", "Programming"]
+    },
+    "DevOps": {
+        "description": "Bridge development and operations for faster software delivery",
+        "topics": ["CI/CD Pipelines", "Infrastructure as Code", "Monitoring", "Containerization", "Automation", "Cloud Platforms"],
+        "prerequisites": ["Programming", "Linux", "Networking"]
+    }
+}
+
+
+def weakest_topics(topic_knowledge, count=3):
+    """Topics with the lowest self-rated level, keeping the field's own topic order on ties"""
+    ranked = sorted(topic_knowledge, key=lambda topic: KNOWLEDGE_LEVELS.index(topic_knowledge[topic]))
+    return ranked[:count]
+
+
+def profile_slots(field, knowledge):
+    """Compact canonical encoding of a knowledge profile for the prompt templates"""
+    info = CS_FIELDS[field]
+    return {
+        "field": field,
+        "overall_level": knowledge["overall_level"],
+        "topics": encode_levels(knowledge["topic_knowledge"], KNOWLEDGE_LEVELS, info["topics"]),
+        "prereqs": encode_levels(knowledge["prereq_knowledge"], KNOWLEDGE_LEVELS, info["prerequisites"]),
+        "background": " ".join((knowledge.get("additional_info") or "").split()) or "-",
+    }
+
+
+# Templates are compiled once; slots named in `truncate` are cut to keep each prompt under budget
+ROADMAP_TEMPLATE = PromptTemplate("roadmap", """Create a comprehensive personalized learning roadmap for {field}.
+
+STUDENT PROFILE:
+- Overall Experience: {overall_level}
+- Topic Knowledge: {topics}
+- Prerequisites: {prereqs}
+- Background: {background}
+
+ASSESSMENT RESULTS:
+{assessment}
+
+Create a detailed roadmap with these sections:
+1. **Foundation Phase** (Weeks 1-4): Prerequisites and basics
+2. **Core Learning Phase** (Weeks 5-12): Main concepts and skills
+3. **Practical Application Phase** (Weeks 13-20): Projects and hands-on work
+4. **Advanced Topics Phase** (Weeks 21-28): Specialized areas
+5. **Professional Development** (Weeks 29-36): Industry-relevant skills
+
+For each phase, include:
+- Specific topics to study
+- Recommended resources (courses, books, tutorials)
+- Practical projects
+- Skills you'll gain
+- Time estimates
+- Prerequisites check
+
+Format with clear headings, bullet points, and actionable steps.""", max_tokens=800, truncate=("assessment", "background"))
+
+ROADMAP_DELTA_TEMPLATE = PromptTemplate("roadmap_delta", """The {field} learning plan below was written for a student whose profile differs slightly from this one.
+
+PROFILE DIFFERENCES (theirs -> this student's):
+{changes}
+
+Overall Experience: {overall_level}
+
+PLAN:
+{roadmap}
+
+List 3-5 short bullet-point roadmap adjustments for this student (what to skip, shorten, or add, and in which phase).
+Do not repeat the plan.""", max_tokens=3000, truncate=("roadmap",))
+
+COURSES_TEMPLATE = PromptTemplate("courses", """Based on the student's profile in {field}, recommend 4-6 specific courses that would complement their learning journey.
+
+Student Profile:
+- Level: {overall_level}
+- Background: {background}
+
+For each course, provide:
+- Course title
+- Description (2-3 sentences)
+- Duration estimate
+- Difficulty level
+- Key skills learned
+- Why it's recommended for this student
+
+Focus on practical, industry-relevant courses from platforms like Coursera, edX, Udemy, or similar.""", max_tokens=400,
+    truncate=("background",))
+
+QUESTIONS_TEMPLATE = PromptTemplate("questions", """Create {count} multiple-choice questions to assess knowledge in {field} for someone with {overall_level} experience level.
+
+Topic Knowledge: {topics}
+Prerequisite Knowledge: {prereqs}
+Additional Info: {background}{focus_line}
+
+Create questions that:
+1. Test practical understanding, not just theory
+2. Are appropriate for their stated experience level
+3. Cover different aspects of the field
+4. Include scenario-based questions
+5. Help identify specific learning gaps
+
+Respond with a JSON array only, one object per question:
+[{{"question": "...", "options": ["...", "...", "...", "..."], "answer": "A", "topic": "..."}}]
+- "options" holds exactly 4 answer texts without letter prefixes
+- "answer" is the letter (A-D) of the correct option
+- "topic" is one of: {topic_names}
+
+Make sure questions are relevant and help determine the best learning path.""", max_tokens=700, truncate=("background",))
+
+
+def build_roadmap_prompt(field, knowledge, answers, score=None):
+    """
+    Main roadmap prompt; `answers` maps question index to {"question", "choice", "correct", ...}.
+    With a `score` vector from quiz_engine.score_answers, scored answers are summarised by topic
+    instead of being quoted, and only unscored ones are sent as text.
+    """
+    # Prepare assessment summary; answers were already scored locally against the answer key
+    verdicts = {True: " (correct)", False: " (incorrect)", None: ""}
+    quoted = answers.values() if score is None else [a for a in answers.values() if a.get("correct") is None]
+    lines = [f"Q: {a['question']}\nA: {a['choice']}{verdicts[a.get('correct')]}" for a in quoted]
+    if score is not None and score["scored"]:
+        by_topic = ", ".join(f"{topic} {right}/{total}" for topic, (right, total) in score["by_topic"].items())
+        lines.insert(0, f"Score: {score['correct']}/{score['scored']} correct ({by_topic}); "
+                        f"ability estimate {score['ability']:+.2f} logits (0 = intermediate level)")
+    elif score is None:
+        scored = [a["correct"] for a in answers.values() if a.get("correct") is not None]
+        if scored:
+            lines.insert(0, f"Score: {sum(scored)}/{len(scored)} correct")
+    return ROADMAP_TEMPLATE.render(assessment="\n".join(lines) or "-", **profile_slots(field, knowledge))
+
+
+def build_roadmap_delta_prompt(field, knowledge, roadmap, differences):
+    """
+    Cheap follow-up for a roadmap reused from a similar profile: asks only for the adjustments
+    the profile differences call for, not a new roadmap.
+    """
+    changes = "\n".join(f"- {change}" for change in differences)
+    return ROADMAP_DELTA_TEMPLATE.render(field=field, overall_level=knowledge["overall_level"], changes=changes,
+                                         roadmap=roadmap)
+
+
+def build_courses_prompt(field, knowledge):
+    return COURSES_TEMPLATE.render(**profile_slots(field, knowledge))
+
+
+def build_question_prompt(field, knowledge, count=5, focus_topic=None):
+    """Prompt asking for `count` MCQs tailored to a knowledge profile"""
+    focus_line = f"\nFocus Topic: most questions should probe {focus_topic}" if focus_topic else ""
+    return QUESTIONS_TEMPLATE.render(count=count, focus_line=focus_line,
+                                     topic_names=", ".join(CS_FIELDS[field]["topics"]),
+                                     **profile_slots(field, knowledge))
+
+
+class Question(NamedTuple):
+    """One validated MCQ; this is what session state and the question bank hold"""
+    text: str
+    options: Tuple[str, ...]
+    answer: Optional[int] = None  # index into options, when the model supplied a key
+    topic: Optional[str] = None
+    difficulty: Optional[str] = None  # level of curated bank questions, e.g. "Beginner"
+
+    def is_correct(self, choice):
+        """True/False against the answer key, None when the question has no key"""
+        if self.answer is None:
+            return None
+        return choice == self.options[self.answer]
+
+    def to_json(self):
+        return json.dumps(self._asdict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, payload):
+        data = json.loads(payload)
+        return cls(data["text"], tuple(data["options"]), data.get("answer"), data.get("topic"), data.get("difficulty"))
+
+
+def _answer_index(answer, option_count):
+    if isinstance(answer, str):
+        answer = answer.strip().upper()[:1]
+        index = ord(answer) - ord("A") if answer else -1
+    elif isinstance(answer, int) and not isinstance(answer, bool):
+        index = answer
+    else:
+        return None
+    return index if 0 <= index < option_count else None
+
+
+def validate_question(item):
+    """Turn one decoded JSON object into a Question, raising ValueError when it is unusable"""
+    if not isinstance(item, dict):
+        raise ValueError("question entry is not an object")
+    text = item.get("question")
+    options = item.get("options")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError("missing question text")
+    if not isinstance(options, list) or not 2 <= len(options) <= 6:
+        raise ValueError("expected 2-6 options")
+    if not all(isinstance(option, str) and option.strip() for option in options):
+        raise ValueError("options must be non-empty strings")
+    topic = item.get("topic")
+    return Question(
+        text=text.strip(),
+        options=tuple(option.strip() for option in options),
+        answer=_answer_index(item.get("answer"), len(options)),
+        topic=topic.strip() if isinstance(topic, str) and topic.strip() else None,
+    )
+
+
+def parse_questions(questions_text):
+    """
+    Decode the model's JSON answer into Question records, once, when it arrives.
+    Raises ValueError if the payload isn't a JSON array; individual bad entries are logged and skipped.
+    """
+    payload = questions_text.strip()
+    if payload.startswith("```"):
+        # Tolerate a fenced ```json block even though we ask for bare JSON
+        payload = payload.strip("`")
+        payload = payload[payload.index("\n") + 1:] if "\n" in payload else ""
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        advisor_metrics.record_parse_failure("invalid_json")
+        raise
+    if isinstance(data, dict):
+        data = data.get("questions")
+    if not isinstance(data, list):
+        advisor_metrics.record_parse_failure("not_a_list")
+        raise ValueError("expected a JSON array of questions")
+
+    questions = []
+    for position, item in enumerate(data, 1):
+        try:
+            questions.append(validate_question(item))
+        except ValueError as e:
+            logger.warning("Dropping malformed question %d: %s", position, e)
+            advisor_metrics.record_parse_failure("invalid_question")
+    return questions
+
+
+def create_model(api_key):
+    """Gemini client (or the offline fake); the SDK is imported here so importing advisor stays cheap"""
+    if USE_FAKE_LLM:
+        from fake_gemini import FakeGenerativeModel
+
+        return FakeGenerativeModel()
+
+    import google.generativeai as gen_ai
+
+    gen_ai.configure(api_key=api_key)
+    return gen_ai.GenerativeModel(MODEL_NAME)
+
+
+class AdvisorLLM:
+    """
+    Gemini access for the advisor: response cache in front, dispatcher (rate limit, retries,
+    coalescing) behind. `get_model` is called lazily so the client is only built on a cache miss.
+    """
+
+    def __init__(self, get_model, cache, dispatcher, model_name=MODEL_NAME):
+        self.get_model = get_model
+        self.cache = cache
+        self.dispatcher = dispatcher
+        self.model_name = model_name
+
+    def generate_text(self, prompt, generation_config=None, kind="completion", cache=True):
+        """
+        Generate a completion for `prompt`, serving repeated prompts from the response cache.
+        With cache=False the model is always asked (and concurrent identical prompts are not
+        coalesced), for callers that want a new sample rather than the stored one.
+        """
+        key = fingerprint(self.model_name, normalize_prompt(prompt), generation_config)
+
+        def request(timeout):
+            started = time.perf_counter()
+            try:
+                response = self.get_model().generate_content(
+                    prompt, generation_config=generation_config, request_options={"timeout": timeout}
+                )
+                text = response.text.strip()
+            except Exception:
+                advisor_metrics.record_llm_call(kind, time.perf_counter() - started, ok=False)
+                raise
+            advisor_metrics.record_llm_call(kind, time.perf_counter() - started,
+                                            getattr(response, "usage_metadata", None))
+            return text
+
+        if not cache:
+            return self.dispatcher.call(None, request)
+        # Identical prompts from concurrent sessions share the same in-flight request
+        return self.cache.get_or_generate(key, lambda: self.dispatcher.call(key, request))
+
+    def stream_text(self, prompt, kind="completion"):
+        """Yield the completion for `prompt` chunk by chunk; the full text is cached once the stream ends"""
+        key = fingerprint(self.model_name, normalize_prompt(prompt), None)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        started = time.perf_counter()
+
+        def open_stream(timeout):
+            # Retries only make sense until the first chunk has arrived
+            chunks = iter(self.get_model().generate_content(
+                prompt, stream=True, request_options={"timeout": timeout}
+            ))
+            return next(chunks, None), chunks
+
+        parts = []
+        chunk = None
+        try:
+            first_chunk, chunks = self.dispatcher.call(None, open_stream)
+            ttft = time.perf_counter() - started
+            if first_chunk is not None:
+                for chunk in itertools.chain([first_chunk], chunks):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+        except Exception:
+            advisor_metrics.record_llm_call(kind, time.perf_counter() - started, ok=False)
+            raise
+        # The last chunk carries the usage totals for the whole stream
+        advisor_metrics.record_llm_call(kind, time.perf_counter() - started,
+                                        getattr(chunk, "usage_metadata", None), ttft=ttft)
+
+        full_text = "".join(parts).strip()
+        if full_text:
+            self.cache.set(key, full_text)
+
+
+def generate_questions(llm, bank, field, knowledge, count=5, freshness=0.0, rng=random, quiz=None, exclude=()):
+    """
+    Assessment questions for a knowledge profile: taken from the curated `quiz` bank when it has a
+    full set at the user's level that avoids `exclude` (question texts already asked), else sampled
+    from the precomputed bank when it covers the weak topics, generated by the LLM on a miss or for
+    a `freshness` share of requests. Fresh sets skip the response cache, which would otherwise hand
+    every learner with the same profile the same "fresh" set.
+    """
+    questions = []
+    fresh = rng.random() < freshness
+    if not fresh:
+        if quiz is not None:
+            questions = quiz.sample_for(field, knowledge["overall_level"], count=count, exclude=exclude, rng=rng)
+        if not questions:
+            questions = bank.sample(field, knowledge["overall_level"], weakest_topics(knowledge["topic_knowledge"]),
+                                    count=count, rng=rng)
+
+    if not questions:
+        prompt = build_question_prompt(field, knowledge, count=count)
+        questions = parse_questions(llm.generate_text(prompt, JSON_GENERATION_CONFIG, kind="questions",
+                                                      cache=not fresh))
+        if not questions:
+            raise ValueError("the model returned no usable questions")
+    return questions
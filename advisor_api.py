@@ -0,0 +1,307 @@
+"""
+Headless JSON API for the learning path advisor, so the dashboard can call the pipeline directly
+instead of holding a Streamlit websocket session per user.
+
+    python advisor_api.py --port 8502
+    ADVISOR_API_ORIGINS=https://dashboard.example.com python advisor_api.py   # CORS origins, comma-separated
+
+Endpoints:
+    GET  /api/health
+    GET  /api/fields                       CS_FIELDS and the level scales
+    POST /api/questions  {field, knowledge, exclude?}   exclude: question texts already asked (retakes)
+    POST /api/roadmap    {field, knowledge, answers}    answers: [{id, choice}, ...]
+    POST /api/batch      {requests: [{op: "questions" | "roadmap", ...}, ...]}
+
+`knowledge` has the same shape as st.session_state.current_knowledge; missing ratings default to
+"No Knowledge". Questions are sent as {id, text, options, topic, difficulty}: their answer keys
+stay on the server (the last MAX_ANSWER_KEYS issued by this process), and each {id, choice} in
+`answers` is scored against them, so clients cannot choose their own score. An answer may give
+{question, choice} instead of an id; it is passed to the roadmap prompt unscored. The roadmap
+response includes the score vector. Gemini calls share one
+response cache, dispatcher and question bank per process and run in a thread pool, so a single
+event loop serves many concurrent requests.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from advisor import (CS_FIELDS, EXPERIENCE_LEVELS, KNOWLEDGE_LEVELS, AdvisorLLM, build_courses_prompt,
+                     build_roadmap_delta_prompt, build_roadmap_prompt, create_model, generate_questions)
+from llm_cache import get_shared_cache
+from llm_dispatch import LLMDispatcher
+from question_bank import get_shared_bank
+from quiz_engine import get_shared_quiz, score_answers
+from roadmap_index import describe_differences, encode_profile, get_shared_index
+
+MAX_BATCH_SIZE = 50
+MAX_ANSWER_KEYS = 100_000  # issued questions whose answer keys are remembered for scoring
+# Browser origins allowed to call the API (comma-separated); the dashboard is served by server.js
+DEFAULT_ORIGINS = "http://localhost:3000,http://127.0.0.1:3000"
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def normalize_knowledge(field, knowledge):
+    """Validate a knowledge profile against the field, filling unrated topics with the lowest level"""
+    if not isinstance(field, str) or field not in CS_FIELDS:
+        raise BadRequest(f"unknown field: {field!r}")
+    knowledge = knowledge or {}
+    if not isinstance(knowledge, dict):
+        raise BadRequest("knowledge must be an object")
+    additional_info = knowledge.get("additional_info") or ""
+    if not isinstance(additional_info, str):
+        raise BadRequest("additional_info must be a string")
+    level = knowledge.get("overall_level", EXPERIENCE_LEVELS[0])
+    if level not in EXPERIENCE_LEVELS:
+        raise BadRequest(f"overall_level must be one of {EXPERIENCE_LEVELS}")
+
+    def ratings(name, items):
+        given = knowledge.get(name) or {}
+        if not isinstance(given, dict):
+            raise BadRequest(f"{name} must be an object")
+        result = {}
+        for item in items:
+            rating = given.get(item, KNOWLEDGE_LEVELS[0])
+            if rating not in KNOWLEDGE_LEVELS:
+                raise BadRequest(f"{name}[{item!r}] must be one of {KNOWLEDGE_LEVELS}")
+            result[item] = rating
+        return result
+
+    return {
+        "overall_level": level,
+        "topic_knowledge": ratings("topic_knowledge", CS_FIELDS[field]["topics"]),
+        "prereq_knowledge": ratings("prereq_knowledge", CS_FIELDS[field]["prerequisites"]),
+        "additional_info": additional_info,
+    }
+
+
+def question_id(question):
+    """Stable id of an issued question; hashes text and options only, so it gives nothing away about the key"""
+    digest = hashlib.sha256("\x1f".join((question.text,) + tuple(question.options)).encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def normalize_answers(answers, answer_keys):
+    """Answers in the session-state shape, scored against the server's answer keys"""
+    if not isinstance(answers or [], list):
+        raise BadRequest("answers must be a list")
+    normalized = {}
+    for idx, answer in enumerate(answers or []):
+        if not isinstance(answer, dict) or "choice" not in answer or ("id" not in answer and "question" not in answer):
+            raise BadRequest("each answer needs 'choice' and the question's 'id'")
+        choice = answer["choice"]
+        if not isinstance(choice, str):
+            raise BadRequest(f"answers[{idx}].choice must be a string")
+        if "id" not in answer:
+            if not isinstance(answer["question"], str):
+                raise BadRequest(f"answers[{idx}].question must be a string")
+            # A question this server did not issue: quoted in the prompt, never scored
+            normalized[idx] = {"question": answer["question"], "choice": choice,
+                               "correct": None, "topic": None, "difficulty": None}
+            continue
+        question = answer_keys.get(answer["id"]) if isinstance(answer["id"], str) else None
+        if question is None:
+            raise BadRequest(f"unknown or expired question id: {answer['id']!r}")
+        normalized[idx] = {"question": question.text, "choice": choice, "correct": question.is_correct(choice),
+                           "topic": question.topic, "difficulty": question.difficulty}
+    return normalized
+
+
+class AdvisorService:
+    def __init__(self, llm, bank, workers=32, freshness=0.1, quiz=None, roadmap_index=None, delta_edits=True):
+        self.llm = llm
+        self.bank = bank
+        self.quiz = quiz
+        self.roadmap_index = roadmap_index
+        self.delta_edits = delta_edits
+        self.freshness = freshness
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="advisor-api")
+        self.answer_keys = OrderedDict()  # question id -> Question; only touched on the event loop
+
+    def _issue(self, question):
+        """Client view of a question; its answer key is kept here for scoring"""
+        key = question_id(question)
+        self.answer_keys[key] = question
+        self.answer_keys.move_to_end(key)
+        while len(self.answer_keys) > MAX_ANSWER_KEYS:
+            self.answer_keys.popitem(last=False)
+        return {"id": key, "text": question.text, "options": list(question.options), "topic": question.topic,
+                "difficulty": question.difficulty}
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    async def questions(self, payload):
+        field = payload.get("field")
+        knowledge = normalize_knowledge(field, payload.get("knowledge"))
+        exclude = payload.get("exclude") or []
+        if not isinstance(exclude, list) or not all(isinstance(text, str) for text in exclude):
+            raise BadRequest("exclude must be a list of question texts")
+        questions = await self._run(generate_questions, self.llm, self.bank, field, knowledge,
+                                    freshness=self.freshness, quiz=self.quiz, exclude=exclude)
+        return {"field": field, "questions": [self._issue(question) for question in questions]}
+
+    async def roadmap(self, payload):
+        field = payload.get("field")
+        knowledge = normalize_knowledge(field, payload.get("knowledge"))
+        answers = normalize_answers(payload.get("answers"), self.answer_keys)
+        score = score_answers(answers, knowledge["overall_level"])
+
+        # Both prompts go out at once; one failing still returns the other section
+        results = await asyncio.gather(
+            self._roadmap_text(field, knowledge, answers, score),
+            self._run(self.llm.generate_text, build_courses_prompt(field, knowledge), kind="courses"),
+            return_exceptions=True,
+        )
+        response = {"field": field, "score": score, "errors": {}}
+        for name, result in zip(("roadmap", "courses"), results):
+            if isinstance(result, Exception):
+                response[name] = None
+                response["errors"][name] = str(result)
+            else:
+                response[name] = result
+        return response
+
+    async def _roadmap_text(self, field, knowledge, answers, score):
+        """Roadmap of a nearby stored profile plus generated adjustments if there is one, else a new roadmap"""
+        match = None
+        if self.roadmap_index is not None:
+            match = await self._run(self.roadmap_index.nearest, field, knowledge, score)
+        if match is None:
+            roadmap = await self._run(self.llm.generate_text, build_roadmap_prompt(field, knowledge, answers, score),
+                                      kind="roadmap")
+            if self.roadmap_index is not None and roadmap:
+                await self._run(self.roadmap_index.add, field, knowledge, roadmap, score)
+            return roadmap
+        differences = describe_differences(field, match.vector, encode_profile(field, knowledge, score))
+        if not differences or not self.delta_edits:
+            return match.roadmap
+        prompt = build_roadmap_delta_prompt(field, knowledge, match.roadmap, differences)
+        adjustments = await self._run(self.llm.generate_text, prompt, kind="roadmap_delta")
+        return f"{match.roadmap}\n\n### 🔧 Adjustments for your profile\n{adjustments}"
+
+    async def dispatch(self, item):
+        """Run one batch entry, reporting failures inline instead of failing the whole batch"""
+        operations = {"questions": self.questions, "roadmap": self.roadmap}
+        if not isinstance(item, dict) or item.get("op") not in operations:
+            return {"error": "each request needs op 'questions' or 'roadmap'"}
+        try:
+            return await operations[item["op"]](item)
+        except BadRequest as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"generation failed: {e}"}
+
+
+async def read_json(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise BadRequest("invalid JSON body")
+    if not isinstance(payload, dict):
+        raise BadRequest("body must be a JSON object")
+    return payload
+
+
+def create_app(service, allowed_origins=None):
+    if allowed_origins is None:
+        allowed_origins = os.getenv("ADVISOR_API_ORIGINS", DEFAULT_ORIGINS)
+    if isinstance(allowed_origins, str):
+        allowed_origins = [origin.strip() for origin in allowed_origins.split(",") if origin.strip()]
+    allowed_origins = set(allowed_origins)
+
+    @web.middleware
+    async def errors_and_cors(request, handler):
+        if request.method == "OPTIONS":
+            response = web.Response()
+        else:
+            try:
+                response = await handler(request)
+            except BadRequest as e:
+                response = web.json_response({"error": str(e)}, status=400)
+            except web.HTTPException as e:
+                # Returning the exception itself is deprecated in aiohttp; answer 404/405/413 like our own errors
+                response = web.json_response({"error": e.reason}, status=e.status)
+                if "Allow" in e.headers:
+                    response.headers["Allow"] = e.headers["Allow"]
+            except Exception as e:
+                response = web.json_response({"error": f"generation failed: {e}"}, status=502)
+        origin = request.headers.get("Origin")
+        if "*" in allowed_origins:
+            response.headers["Access-Control-Allow-Origin"] = "*"
+        elif origin in allowed_origins:
+            response.headers["Access-Control-Allow-Origin"] = origin
+            response.headers["Vary"] = "Origin"
+        response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+        return response
+
+    async def health(request):
+        return web.json_response({"status": "ok"})
+
+    async def fields(request):
+        return web.json_response({"fields": CS_FIELDS, "experience_levels": EXPERIENCE_LEVELS,
+                                  "knowledge_levels": KNOWLEDGE_LEVELS})
+
+    async def questions(request):
+        return web.json_response(await service.questions(await read_json(request)))
+
+    async def roadmap(request):
+        return web.json_response(await service.roadmap(await read_json(request)))
+
+    async def batch(request):
+        items = (await read_json(request)).get("requests")
+        if not isinstance(items, list) or not 0 < len(items) <= MAX_BATCH_SIZE:
+            raise BadRequest(f"requests must be a list of 1-{MAX_BATCH_SIZE} entries")
+        results = await asyncio.gather(*(service.dispatch(item) for item in items))
+        return web.json_response({"results": results})
+
+    app = web.Application(middlewares=[errors_and_cors], client_max_size=256 * 1024)
+    app.router.add_get("/api/health", health)
+    app.router.add_get("/api/fields", fields)
+    app.router.add_post("/api/questions", questions)
+    app.router.add_post("/api/roadmap", roadmap)
+    app.router.add_post("/api/batch", batch)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless learning path advisor API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("ADVISOR_API_PORT", "8502")))
+    parser.add_argument("--workers", type=int, default=32, help="threads for blocking Gemini calls")
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    model = None
+    model_lock = threading.Lock()
+
+    def get_model():
+        # Built on the first cache miss, like the Streamlit app
+        nonlocal model
+        with model_lock:
+            if model is None:
+                model = create_model(api_key)
+            return model
+
+    llm = AdvisorLLM(get_model, get_shared_cache(), LLMDispatcher())
+    service = AdvisorService(llm, get_shared_bank(), workers=args.workers,
+                             freshness=float(os.getenv("QUESTION_BANK_FRESHNESS", "0.1")), quiz=get_shared_quiz(),
+                             roadmap_index=get_shared_index(),
+                             delta_edits=os.getenv("ROADMAP_DELTA_EDITS", "1") == "1")
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Process-wide instrumentation for the advisor pipeline.
+
+Records wall time per stage and per Streamlit rerun, LLM latency and token counts, cache hit
+rates and question parse failures, and exports them two ways:
+- Prometheus text format, written to ADVISOR_METRICS_FILE and/or served on ADVISOR_METRICS_PORT
+- one JSON object per event on the "advisor.metrics" logger (to ADVISOR_METRICS_LOG if set)
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+event_log = logging.getLogger("advisor.metrics")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    samples.append((self.name + "_bucket", key + (("le", repr(float(bound))),), cumulative))
+                samples.append((self.name + "_bucket", key + (("le", "+Inf"),), series[-1]))
+                samples.append((self.name + "_sum", key, series[-2]))
+                samples.append((self.name + "_count", key, series[-1]))
+        return samples
+
+
+class Gauge:
+    """Value read from a callback at export time (e.g. cache hit rate)"""
+
+    def __init__(self, name, help_text, collect, kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.collect = collect  # () -> {labels tuple: value} or a plain number
+
+    def samples(self):
+        values = self.collect()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, key, value) for key, value in values.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, collect, kind="gauge"):
+        # Re-registering replaces the callback, so a rerun can point it at fresh objects
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, collect, kind)
+            return self._metrics[name]
+
+    def render(self):
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram("advisor_stage_seconds", "Wall time spent rendering each advisor stage")
+rerun_seconds = registry.histogram("advisor_rerun_seconds", "Wall time of a full Streamlit script run")
+llm_seconds = registry.histogram("advisor_llm_seconds", "Gemini call latency (total, or to first token for ttft)")
+llm_tokens = registry.histogram("advisor_llm_tokens", "Prompt and completion tokens per Gemini call", TOKEN_BUCKETS)
+llm_calls = registry.counter("advisor_llm_calls_total", "Gemini calls by prompt kind and outcome")
+parse_failures = registry.counter("advisor_parse_failures_total", "Assessment questions that failed validation")
+prompt_tokens = registry.histogram("advisor_prompt_tokens", "Estimated input tokens per rendered prompt", TOKEN_BUCKETS)
+prompt_truncations = registry.counter("advisor_prompt_truncations_total", "Prompt slots cut to fit the token budget")
+
+
+def log_event(event, **fields):
+    if event_log.isEnabledFor(logging.INFO):
+        event_log.info(json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str))
+
+
+@contextmanager
+def time_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stage_seconds.observe(elapsed, stage=stage)
+        log_event("stage", stage=stage, seconds=round(elapsed, 4))
+
+
+def record_rerun(stage, seconds, cpu_seconds=None):
+    rerun_seconds.observe(seconds, stage=stage)
+    log_event("rerun", stage=stage, seconds=round(seconds, 4),
+              cpu_seconds=round(cpu_seconds, 4) if cpu_seconds is not None else None)
+
+
+def record_llm_call(kind, seconds, usage=None, ttft=None, ok=True):
+    """`usage` is a Gemini usage_metadata object (or anything with the same token count attributes)"""
+    outcome = "ok" if ok else "error"
+    llm_calls.inc(kind=kind, outcome=outcome)
+    llm_seconds.observe(seconds, kind=kind, phase="total")
+    if ttft is not None:
+        llm_seconds.observe(ttft, kind=kind, phase="ttft")
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    if prompt_tokens is not None:
+        llm_tokens.observe(prompt_tokens, kind=kind, type="prompt")
+    if completion_tokens is not None:
+        llm_tokens.observe(completion_tokens, kind=kind, type="completion")
+    log_event("llm_call", kind=kind, outcome=outcome, seconds=round(seconds, 4),
+              ttft=round(ttft, 4) if ttft is not None else None,
+              prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def record_prompt(name, tokens, truncated=()):
+    prompt_tokens.observe(tokens, prompt=name)
+    for slot in truncated:
+        prompt_truncations.inc(prompt=name, slot=slot)
+    if truncated:
+        log_event("prompt_truncated", prompt=name, tokens=tokens, slots=list(truncated))
+
+
+def record_parse_failure(reason):
+    parse_failures.inc(reason=reason)
+    log_event("parse_failure", reason=reason)
+
+
+def export_cache_stats(cache):
+    registry.gauge("advisor_cache_hit_ratio", "Response cache hit ratio since process start",
+                   lambda: cache.stats()["hit_rate"])
+    registry.gauge("advisor_cache_lookups_total", "Response cache lookups by result",
+                   lambda: {(("result", name),): value for name, value in cache.stats().items()
+                            if name in ("memory_hits", "disk_hits", "misses")}, kind="counter")
+
+
+def configure_json_log(path):
+    """Send JSON event lines to `path`, one object per line"""
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    event_log.addHandler(handler)
+    event_log.setLevel(logging.INFO)
+    event_log.propagate = False
+
+
+_last_written = 0.0
+
+
+def write_prometheus_file(path, min_interval=5.0):
+    """Atomically rewrite the textfile-collector file, at most every `min_interval` seconds"""
+    global _last_written
+    now = time.monotonic()
+    if now - _last_written < min_interval:
+        return
+    _last_written = now
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_http_server(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
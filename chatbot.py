@@ -1,23 +1,115 @@
+import time
+RUN_STARTED = time.perf_counter()
+RUN_STARTED_CPU = time.thread_time()
+
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 from dotenv import load_dotenv
-import google.generativeai as gen_ai
-
-# Load environment variables
-load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-
-if not GOOGLE_API_KEY:
+import advisor_metrics
+from advisor import (CS_FIELDS, EXPERIENCE_LEVELS, KNOWLEDGE_LEVELS, USE_FAKE_LLM, AdvisorLLM,
+                     build_courses_prompt, build_roadmap_delta_prompt, build_roadmap_prompt, create_model,
+                     generate_questions)
+from llm_cache import get_shared_cache
+from llm_dispatch import LLMDispatcher
+from prompt_compiler import estimate_tokens
+from question_bank import get_shared_bank
+from quiz_engine import get_shared_quiz, score_answers
+from roadmap_index import describe_differences, encode_profile, get_shared_index
+from session_store import get_shared_store, new_session_id
+
+CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "css", "chatbot.css")
+
+# Streamlit re-executes this script on every interaction; everything below that is
+# process-wide (env, model client, thread pool, static assets) is built once via st.cache_resource.
+
+@st.cache_resource
+def startup_timings():
+    """Process-wide timing record shown in the sidebar performance panel"""
+    return {"cold_start": None, "model_init": None, "reruns": deque(maxlen=500)}
+
+@st.cache_resource
+def load_api_key():
+    load_dotenv()
+    return os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+
+@st.cache_resource
+def get_model():
+    """Single Gemini client for the process; google.generativeai is only imported on the first LLM call"""
+    started = time.perf_counter()
+    client = create_model(load_api_key())
+    startup_timings()["model_init"] = time.perf_counter() - started
+    return client
+
+@st.cache_resource
+def get_llm_executor():
+    # Worker threads only call the model; all Streamlit rendering stays on the script thread
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+@st.cache_resource
+def get_llm():
+    """Cache + dispatch wrapper around the lazily built Gemini client"""
+    return AdvisorLLM(get_model, get_shared_cache(), LLMDispatcher())
+
+@st.cache_resource
+def setup_metrics_export():
+    """JSON event log and Prometheus /metrics endpoint, configured once per process"""
+    if os.getenv("ADVISOR_METRICS_LOG"):
+        advisor_metrics.configure_json_log(os.getenv("ADVISOR_METRICS_LOG"))
+    if os.getenv("ADVISOR_METRICS_PORT"):
+        advisor_metrics.start_http_server(int(os.getenv("ADVISOR_METRICS_PORT")))
+    return os.getenv("ADVISOR_METRICS_FILE")
+
+@st.cache_resource
+def load_css():
+    with open(CSS_PATH, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+@st.cache_resource
+def sidebar_intro():
+    """Static sidebar text as one markdown element instead of a dozen separate ones"""
+    fields = "  \n".join(f"• {field_name}" for field_name in CS_FIELDS)
+    return f"""## 🤖 CS Learning Path Advisor
+### Steps to Follow:
+1. **Choose your field of interest** 🎯
+2. **Tell us your current knowledge** 📚
+3. **Complete the assessment** 🧪
+4. **Get your learning roadmap** 🗺️
+
+---
+💡 **Available Fields:**  
+{fields}"""
+
+if not load_api_key() and not USE_FAKE_LLM:
     st.error("Google API key is not set. Please check your .env file and ensure you have either GOOGLE_API_KEY or GEMINI_API_KEY set.")
     st.stop()
 
-# Configure Gemini AI
-try:
-    gen_ai.configure(api_key=GOOGLE_API_KEY)
-    model = gen_ai.GenerativeModel("gemini-1.5-flash")
-except Exception as e:
-    st.error(f"Error configuring Gemini AI: {e}")
-    st.stop()
+# Shared across sessions: identical prompts are answered from memory/disk instead of Gemini,
+# and everything else goes through one rate-limited, retrying dispatcher
+llm = get_llm()
+response_cache = llm.cache
+llm_dispatcher = llm.dispatcher
+generate_text = llm.generate_text
+stream_text = llm.stream_text
+
+METRICS_FILE = setup_metrics_export()
+advisor_metrics.export_cache_stats(response_cache)
+
+# Precomputed assessment questions (see question_bank.py); a share of sessions still gets fresh LLM questions
+question_bank = get_shared_bank()
+# Curated quiz.txt questions (see quiz_engine.py) take precedence for the fields they cover
+quiz_bank = get_shared_quiz()
+QUESTION_BANK_FRESHNESS = float(os.getenv("QUESTION_BANK_FRESHNESS", "0.1"))
+
+llm_executor = get_llm_executor()
+
+# Roadmaps of similar profiles are reused (see roadmap_index.py), optionally with LLM-written adjustments
+roadmap_index = get_shared_index()
+ROADMAP_DELTA_EDITS = os.getenv("ROADMAP_DELTA_EDITS", "1") == "1"
+
+# Saved sessions (see session_store.py)
+session_store = get_shared_store()
 
 # Streamlit page setup
 st.set_page_config(
@@ -26,76 +118,89 @@ st.set_page_config(
     layout="centered"
 )
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        text-align: center;
-        color: #1f77b4;
-        margin-bottom: 30px;
-    }
-    .step-container {
-        background-color: #f0f2f6;
-        padding: 20px;
-        border-radius: 10px;
-        margin: 20px 0;
-    }
-    .success-message {
-        background-color: #d4edda;
-        border: 1px solid #c3e6cb;
-        color: #155724;
-        padding: 10px;
-        border-radius: 5px;
-        margin: 10px 0;
-    }
-    .course-card {
-        background-color: #ffffff;
-        border: 2px solid #e1e5e9;
-        border-radius: 10px;
-        padding: 15px;
-        margin: 10px 0;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    .topic-badge {
-        background-color: #007bff;
-        color: white;
-        padding: 5px 10px;
-        border-radius: 15px;
-        font-size: 0.8em;
-        margin: 2px;
-        display: inline-block;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for better styling (file is read once per process)
+st.markdown(load_css(), unsafe_allow_html=True)
 
 # Sidebar instructions
 with st.sidebar:
-    st.markdown("## 🤖 CS Learning Path Advisor")
-    st.markdown("### Steps to Follow:")
-    st.markdown("1. **Choose your field of interest** 🎯")
-    st.markdown("2. **Tell us your current knowledge** 📚")
-    st.markdown("3. **Complete the assessment** 🧪")
-    st.markdown("4. **Get your learning roadmap** 🗺️")
-    st.markdown("---")
-    st.markdown("💡 **Available Fields:**")
-    st.markdown("• Artificial Intelligence")
-    st.markdown("• Data Science")
-    st.markdown("• Machine Learning")
-    st.markdown("• Web Development")
-    st.markdown("• Mobile Development")
-    st.markdown("• Cybersecurity")
-    st.markdown("• Cloud Computing")
-    st.markdown("• DevOps")
+    st.markdown(sidebar_intro())
     
+    # Response cache statistics
+    with st.expander("⚡ Response cache"):
+        cache_stats = response_cache.stats()
+        st.caption(
+            f"Hits: {cache_stats['memory_hits'] + cache_stats['disk_hits']} "
+            f"(memory {cache_stats['memory_hits']}, disk {cache_stats['disk_hits']}) · "
+            f"Misses: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%}"
+        )
+        reuse_stats = roadmap_index.stats()
+        st.caption(
+            f"Roadmap reuse: {reuse_stats['exact_hits']} exact, {reuse_stats['near_hits']} near · "
+            f"Misses: {reuse_stats['misses']} · Stored: {reuse_stats['entries']}"
+        )
+
+    # LLM dispatch statistics
+    with st.expander("🚦 LLM traffic"):
+        dispatch_stats = llm_dispatcher.stats()
+        st.caption(
+            f"Requests: {dispatch_stats['requests']} · Coalesced: {dispatch_stats['coalesced']} · "
+            f"Retries: {dispatch_stats['retries']} · Failures: {dispatch_stats['failures']} · "
+            f"In flight: {dispatch_stats['in_flight']}"
+        )
+
+    # Startup and rerun timing report
+    with st.expander("⏱️ Startup & rerun timings"):
+        timings = startup_timings()
+        reruns = sorted(timings["reruns"])
+        if timings["cold_start"] is not None:
+            st.caption(f"Cold start (first run incl. imports): {timings['cold_start'] * 1000:.0f} ms")
+        if timings["model_init"] is not None:
+            st.caption(f"Gemini client init (lazy): {timings['model_init'] * 1000:.0f} ms")
+        if reruns:
+            st.caption(
+                f"Reruns: {len(reruns)} · median {reruns[len(reruns) // 2] * 1000:.0f} ms · "
+                f"p95 {reruns[int(len(reruns) * 0.95)] * 1000:.0f} ms"
+            )
+
     # Reset button
     if st.button("🔄 Start Over"):
         for key in list(st.session_state.keys()):
             del st.session_state[key]
+        # The saved snapshot stays reachable through its old link; this tab starts a fresh session
+        if "sid" in st.query_params:
+            del st.query_params["sid"]
         st.rerun()
 
     # Go to Dashboard button
     st.markdown('<a href="http://localhost:3000/dashboard.html" target="_blank"><button style="background-color: #4CAF50; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer;">Go to Dashboard</button></a>', unsafe_allow_html=True)
 
+def snapshot_signature():
+    """Changes whenever the user reaches another stage or new content has been generated"""
+    return (
+        st.session_state.stage,
+        st.session_state.chosen_field,
+        len(st.session_state.assessment_questions),
+        len(st.session_state.answers),
+        bool(st.session_state.roadmap),
+        bool(st.session_state.additional_courses),
+    )
+
+def signed_in_user():
+    """Id of the user signed in through st.login(), or None; never taken from the URL, which anyone can edit"""
+    if st.user.get("is_logged_in"):
+        return st.user.get("email") or st.user.get("sub")
+    return None
+
+def persist_session(force=False):
+    """Snapshot the session at stage transitions so returning users skip regeneration"""
+    # A visitor who has not picked a field yet has nothing worth a row
+    if not force and st.session_state.stage == "choose_field" and not st.session_state.chosen_field:
+        return
+    signature = snapshot_signature()
+    if force or signature != st.session_state.get("saved_signature"):
+        session_store.save(st.session_state.session_id, st.session_state, user_id=signed_in_user())
+        st.session_state.saved_signature = signature
+
 # Initialize session state
 if "stage" not in st.session_state:
     st.session_state.stage = "choose_field"
@@ -105,50 +210,23 @@ if "stage" not in st.session_state:
     st.session_state.answers = {}
     st.session_state.roadmap = []
     st.session_state.additional_courses = []
-
-# Computer Science fields and their subtopics
-CS_FIELDS = {
-    "Artificial Intelligence": {
-        "description": "Learn to build intelligent systems that can perform tasks that typically require human intelligence",
-        "topics": ["Neural Networks", "Natural Language Processing", "Computer Vision", "Reinforcement Learning", "Expert Systems", "AI Ethics"],
-        "prerequisites": ["Python", "Mathematics", "Statistics"]
-    },
-    "Data Science": {
-        "description": "Extract insights and knowledge from structured and unstructured data",
-        "topics": ["Data Analysis", "Statistical Modeling", "Data Visualization", "Big Data", "Business Intelligence", "Predictive Analytics"],
-        "prerequisites": ["Python/R", "Statistics", "SQL", "Mathematics"]
-    },
-    "Machine Learning": {
-        "description": "Build systems that automatically learn and improve from experience",
-        "topics": ["Supervised Learning", "Unsupervised Learning", "Deep Learning", "Feature Engineering", "Model Deployment", "MLOps"],
-        "prerequisites": ["Python", "Mathematics", "Statistics", "Linear Algebra"]
-    },
-    "Web Development": {
-        "description": "Create dynamic websites and web applications",
-        "topics": ["Frontend Development", "Backend Development", "Databases", "API Development", "Web Security", "Cloud Deployment"],
-        "prerequisites": ["HTML", "CSS", "JavaScript"]
-    },
-    "Mobile Development": {
-        "description": "Build applications for mobile devices",
-        "topics": ["iOS Development", "Android Development", "Cross-platform Development", "UI/UX Design", "Mobile Security", "App Store Optimization"],
-        "prerequisites": ["Programming Fundamentals", "Object-Oriented Programming"]
-    },
-    "Cybersecurity": {
-        "description": "Protect systems, networks, and data from digital attacks",
-        "topics": ["Network Security", "Ethical Hacking", "Cryptography", "Incident Response", "Security Compliance", "Risk Assessment"],
-        "prerequisites": ["Networking", "Operating Systems", "Programming"]
-    },
-    "Cloud Computing": {
-        "description": "Design and manage scalable cloud-based solutions",
-        "topics": ["AWS/Azure/GCP", "Containerization", "Microservices", "Serverless Computing", "Cloud Security", "Cost Optimization"],
-        "prerequisites": ["Networking", "Operating Systems", "Programming"]
-    },
-    "DevOps": {
-        "description": "Bridge development and operations for faster software delivery",
-        "topics": ["CI/CD Pipelines", "Infrastructure as Code", "Monitoring", "Containerization", "Automation", "Cloud Platforms"],
-        "prerequisites": ["Programming", "Linux", "Networking"]
-    }
-}
+    st.session_state.roadmap_timing = {}
+
+    # Resume a saved session when the URL carries its (unguessable) id, or a signed-in user's latest one
+    session_id = st.query_params.get("sid")
+    user_id = signed_in_user()
+    restored = None
+    if session_id:
+        restored = session_store.load(session_id)
+    elif user_id:
+        session_id, restored = session_store.latest_for_user(user_id)
+    if restored:
+        for key, value in restored.items():
+            st.session_state[key] = value
+
+    st.session_state.session_id = session_id or new_session_id()
+    st.session_state.saved_signature = snapshot_signature() if restored else None
+    st.query_params["sid"] = st.session_state.session_id
 
 # Step 1 – Choose field of interest
 def choose_field():
@@ -198,13 +276,14 @@ def assess_current_knowledge():
     
     st.subheader("Step 2: Tell us about your current knowledge")
     
-    with st.container():
+    # One form: widget changes stay in the browser and the whole step costs a single rerun on submit
+    with st.form("knowledge_form"):
         st.markdown('<div class="step-container">', unsafe_allow_html=True)
         
         # Overall experience level
         overall_level = st.selectbox(
             f"What's your overall experience level in {st.session_state.chosen_field}?",
-            ["Complete Beginner", "Beginner", "Intermediate", "Advanced"],
+            EXPERIENCE_LEVELS,
             help="Choose the level that best describes your current knowledge"
         )
         
@@ -217,7 +296,7 @@ def assess_current_knowledge():
         for topic in field_info["topics"]:
             topic_level = st.select_slider(
                 f"{topic}:",
-                options=["No Knowledge", "Basic", "Intermediate", "Advanced", "Expert"],
+                options=KNOWLEDGE_LEVELS,
                 value="No Knowledge",
                 key=f"topic_{topic}"
             )
@@ -232,7 +311,7 @@ def assess_current_knowledge():
         for prereq in field_info["prerequisites"]:
             prereq_level = st.select_slider(
                 f"{prereq}:",
-                options=["No Knowledge", "Basic", "Intermediate", "Advanced", "Expert"],
+                options=KNOWLEDGE_LEVELS,
                 value="No Knowledge",
                 key=f"prereq_{prereq}"
             )
@@ -248,7 +327,7 @@ def assess_current_knowledge():
         
         st.markdown('</div>', unsafe_allow_html=True)
         
-        if st.button("Continue to Assessment →", type="primary"):
+        if st.form_submit_button("Continue to Assessment →", type="primary"):
             st.session_state.current_knowledge = {
                 "overall_level": overall_level,
                 "topic_knowledge": topic_knowledge,
@@ -272,62 +351,11 @@ def detailed_assessment():
     if not st.session_state.assessment_questions:
         with st.spinner("Generating personalized assessment questions..."):
             try:
-                field_info = CS_FIELDS[st.session_state.chosen_field]
-                knowledge = st.session_state.current_knowledge
-                
-                # Create detailed prompt for question generation
-                topic_summary = []
-                for topic, level in knowledge["topic_knowledge"].items():
-                    topic_summary.append(f"{topic}: {level}")
-                
-                prereq_summary = []
-                for prereq, level in knowledge["prereq_knowledge"].items():
-                    prereq_summary.append(f"{prereq}: {level}")
-                
-                prompt = f"""Create 5 multiple-choice questions to assess knowledge in {st.session_state.chosen_field} for someone with {knowledge['overall_level']} experience level.
-
-Field: {st.session_state.chosen_field}
-Topic Knowledge: {'; '.join(topic_summary)}
-Prerequisite Knowledge: {'; '.join(prereq_summary)}
-Additional Info: {knowledge['additional_info']}
-
-Create questions that:
-1. Test practical understanding, not just theory
-2. Are appropriate for their stated experience level
-3. Cover different aspects of the field
-4. Include scenario-based questions
-5. Help identify specific learning gaps
-
-Format each question exactly like this:
-Q1: [Practical question text here]
-A) [Option A]
-B) [Option B]
-C) [Option C]
-D) [Option D]
-
-Make sure questions are relevant and help determine the best learning path."""
-
-                response = model.generate_content(prompt)
-                questions_text = response.text.strip()
-                
-                # Parse questions
-                questions = []
-                current_question = ""
-                
-                for line in questions_text.split('\n'):
-                    line = line.strip()
-                    if line.startswith('Q') and ':' in line:
-                        if current_question:
-                            questions.append(current_question.strip())
-                        current_question = line
-                    elif line and (line.startswith('A)') or line.startswith('B)') or 
-                                 line.startswith('C)') or line.startswith('D)')):
-                        current_question += '\n' + line
-                
-                if current_question:
-                    questions.append(current_question.strip())
-                
-                st.session_state.assessment_questions = questions
+                st.session_state.assessment_questions = generate_questions(
+                    llm, question_bank, st.session_state.chosen_field, st.session_state.current_knowledge,
+                    freshness=QUESTION_BANK_FRESHNESS, quiz=quiz_bank,
+                    exclude=st.session_state.get("seen_questions", ()),
+                )
                 
             except Exception as e:
                 st.error(f"Error generating questions: {e}")
@@ -337,45 +365,29 @@ Make sure questions are relevant and help determine the best learning path."""
     st.subheader("Answer the following questions:")
     st.write("These questions will help us create the most effective learning path for you.")
     
-    answers = {}
-    
-    for idx, question_block in enumerate(st.session_state.assessment_questions):
-        if not question_block:
-            continue
-            
-        lines = [line.strip() for line in question_block.split('\n') if line.strip()]
-        if not lines:
-            continue
-            
-        # Extract question text
-        question_line = lines[0]
-        if ':' in question_line:
-            question_text = question_line.split(':', 1)[1].strip()
-        else:
-            question_text = question_line
-        
-        # Extract options
-        options = []
-        for line in lines[1:]:
-            if line and len(line) > 2 and line[1] == ')':
-                options.append(line[3:].strip())
-        
-        if options:
+    # Radios are batched in a form so picking answers doesn't rerun the script per click
+    with st.form("assessment_form"):
+        choices = []
+        for idx, question in enumerate(st.session_state.assessment_questions):
             st.markdown("---")
-            choice = st.radio(
-                f"**Question {idx + 1}:** {question_text}",
-                options,
+            choices.append(st.radio(
+                f"**Question {idx + 1}:** {question.text}",
+                question.options,
                 key=f"detailed_q{idx}",
                 help=f"Select the best answer for question {idx + 1}"
-            )
-            answers[idx] = {"question": question_text, "choice": choice}
-
-    st.session_state.answers = answers
-    
-    if len(answers) > 0:
-        if st.button("Generate My Learning Roadmap →", type="primary"):
-            st.session_state.stage = "generate_roadmap"
-            st.rerun()
+            ))
+
+        submitted = st.form_submit_button("Generate My Learning Roadmap →", type="primary")
+
+    if submitted:
+        # Questions were validated into Question records when generated, so scoring is local
+        st.session_state.answers = {
+            idx: {"question": question.text, "choice": choice, "correct": question.is_correct(choice),
+                  "topic": question.topic, "difficulty": question.difficulty}
+            for idx, (question, choice) in enumerate(zip(st.session_state.assessment_questions, choices))
+        }
+        st.session_state.stage = "generate_roadmap"
+        st.rerun()
 
 # Step 4 – Generate comprehensive roadmap
 def generate_comprehensive_roadmap():
@@ -385,98 +397,117 @@ def generate_comprehensive_roadmap():
     st.markdown('<div class="success-message">', unsafe_allow_html=True)
     st.write(f"**Field:** {st.session_state.chosen_field}")
     st.write(f"**Experience Level:** {st.session_state.current_knowledge['overall_level']}")
-    st.write(f"**Assessment Completed:** {len(st.session_state.answers)} questions answered")
+    field = st.session_state.chosen_field
+    knowledge = st.session_state.current_knowledge
+    # Scored locally; the roadmap prompt gets this compact vector instead of the full Q/A text
+    score = score_answers(st.session_state.answers, knowledge["overall_level"])
+    completed = f"{len(st.session_state.answers)} questions answered"
+    if score["scored"]:
+        completed += f", {score['correct']}/{score['scored']} correct"
+    st.write(f"**Assessment Completed:** {completed}")
     st.markdown('</div>', unsafe_allow_html=True)
 
-    # Generate roadmap and additional courses
-    if not st.session_state.roadmap:
-        with st.spinner("Creating your comprehensive learning roadmap..."):
-            try:
-                field_info = CS_FIELDS[st.session_state.chosen_field]
-                knowledge = st.session_state.current_knowledge
-                
-                # Prepare assessment summary
-                answers_summary = "\n".join([
-                    f"Q: {a['question']}\nA: {a['choice']}" 
-                    for a in st.session_state.answers.values()
-                ])
-                
-                # Generate main roadmap
-                main_prompt = f"""Create a comprehensive personalized learning roadmap for {st.session_state.chosen_field}.
-
-STUDENT PROFILE:
-- Field: {st.session_state.chosen_field}
-- Overall Experience: {knowledge['overall_level']}
-- Topic Knowledge: {knowledge['topic_knowledge']}
-- Prerequisites: {knowledge['prereq_knowledge']}
-- Background: {knowledge['additional_info']}
-
-ASSESSMENT RESULTS:
-{answers_summary}
-
-Create a detailed roadmap with these sections:
-1. **Foundation Phase** (Weeks 1-4): Prerequisites and basics
-2. **Core Learning Phase** (Weeks 5-12): Main concepts and skills
-3. **Practical Application Phase** (Weeks 13-20): Projects and hands-on work
-4. **Advanced Topics Phase** (Weeks 21-28): Specialized areas
-5. **Professional Development** (Weeks 29-36): Industry-relevant skills
-
-For each phase, include:
-- Specific topics to study
-- Recommended resources (courses, books, tutorials)
-- Practical projects
-- Skills you'll gain
-- Time estimates
-- Prerequisites check
-
-Format with clear headings, bullet points, and actionable steps."""
-
-                roadmap_response = model.generate_content(main_prompt)
-                main_roadmap = roadmap_response.text.strip()
-                
-                # Generate additional course recommendations
-                courses_prompt = f"""Based on the student's profile in {st.session_state.chosen_field}, recommend 4-6 specific courses that would complement their learning journey.
-
-Student Profile:
-- Field: {st.session_state.chosen_field}
-- Level: {knowledge['overall_level']}
-- Background: {knowledge['additional_info']}
-
-For each course, provide:
-- Course title
-- Description (2-3 sentences)
-- Duration estimate
-- Difficulty level
-- Key skills learned
-- Why it's recommended for this student
-
-Focus on practical, industry-relevant courses from platforms like Coursera, edX, Udemy, or similar."""
-
-                courses_response = model.generate_content(courses_prompt)
-                additional_courses_text = courses_response.text.strip()
-                
-                st.session_state.roadmap = main_roadmap
-                st.session_state.additional_courses = additional_courses_text
-                
-            except Exception as e:
-                st.error(f"Error generating roadmap: {e}")
-                return
+    field_info = CS_FIELDS[field]
+
+    main_prompt = build_roadmap_prompt(field, knowledge, st.session_state.answers, score)
+    courses_prompt = build_courses_prompt(field, knowledge)
 
-    # Display main roadmap
+    # Placeholders let each section render as soon as its own LLM call finishes
     st.markdown("## 🚀 Your Learning Roadmap")
-    st.markdown(st.session_state.roadmap)
-    
-    # Display additional course recommendations
+    roadmap_placeholder = st.empty()
+
     st.markdown("---")
     st.markdown("## 📚 Recommended Courses")
-    st.markdown(st.session_state.additional_courses)
+    courses_placeholder = st.empty()
+
+    sections = {
+        "roadmap": (main_prompt, roadmap_placeholder, "roadmap"),
+        "additional_courses": (courses_prompt, courses_placeholder, "course recommendations"),
+    }
+
+    # Only sections that are still missing (first visit or a failed call) are requested, in parallel
+    pending = {key: section for key, section in sections.items() if not st.session_state[key]}
+    if pending:
+        for key, (_, placeholder, label) in pending.items():
+            placeholder.info(f"⏳ Creating your {label}...")
+
+        # The roadmap is streamed on the script thread; everything else runs in the pool meanwhile
+        futures = {
+            llm_executor.submit(generate_text, prompt, kind=key): key
+            for key, (prompt, _, _) in pending.items() if key != "roadmap"
+        }
+
+        def render_result(future):
+            key = futures.pop(future)
+            _, placeholder, label = pending[key]
+            try:
+                st.session_state[key] = future.result()
+                placeholder.markdown(st.session_state[key])
+            except Exception as e:
+                placeholder.error(f"Error generating {label}: {e}")
+
+        if "roadmap" in pending:
+            started = time.perf_counter()
+            first_token_at = None
+            # A roadmap generated for a nearby profile is shown at once; at most the adjustments are generated
+            match = roadmap_index.nearest(field, knowledge, score)
+            if match is None:
+                streamed, chunks = "", stream_text(main_prompt, kind="roadmap")
+            else:
+                first_token_at = time.perf_counter()
+                streamed, chunks = match.roadmap, iter(())
+                differences = describe_differences(field, match.vector, encode_profile(field, knowledge, score))
+                if differences and ROADMAP_DELTA_EDITS:
+                    streamed += "\n\n### 🔧 Adjustments for your profile\n"
+                    chunks = stream_text(build_roadmap_delta_prompt(field, knowledge, match.roadmap, differences),
+                                         kind="roadmap_delta")
+                roadmap_placeholder.markdown(streamed + " ▌")
+            try:
+                for chunk in chunks:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    streamed += chunk
+                    roadmap_placeholder.markdown(streamed + " ▌")
+                    for future in [f for f in futures if f.done()]:
+                        render_result(future)
+                st.session_state.roadmap = streamed.strip()
+                roadmap_placeholder.markdown(st.session_state.roadmap)
+                st.session_state.roadmap_timing = {
+                    "time_to_first_token": (first_token_at or time.perf_counter()) - started,
+                    "total_time": time.perf_counter() - started,
+                    "reused_distance": match.distance if match is not None else None,
+                    "prompt_tokens": estimate_tokens(main_prompt) if match is None else None,
+                }
+                if match is None and st.session_state.roadmap:
+                    roadmap_index.add(field, knowledge, st.session_state.roadmap, score)
+            except Exception as e:
+                roadmap_placeholder.error(f"Error generating roadmap: {e}")
+
+        for future in as_completed(list(futures)):
+            render_result(future)
+
+    for key, (_, placeholder, _) in sections.items():
+        if key not in pending and st.session_state[key]:
+            placeholder.markdown(st.session_state[key])
+
+    if st.session_state.get("roadmap_timing"):
+        timing = st.session_state.roadmap_timing
+        if timing.get("reused_distance") is not None:
+            st.caption(f"Roadmap adapted from a similar learner profile (distance {timing['reused_distance']:.2f}) "
+                       f"in {timing['total_time']:.1f}s")
+        else:
+            prompt_size = f", prompt ~{timing['prompt_tokens']} tokens" if timing.get("prompt_tokens") else ""
+            st.caption(f"Roadmap streamed in {timing['total_time']:.1f}s "
+                       f"(first text after {timing['time_to_first_token']:.2f}s{prompt_size})")
+
+    if any(not st.session_state[key] for key in sections):
+        if st.button("🔁 Retry missing sections"):
+            st.rerun()
     
     # Interactive elements
     st.markdown("---")
     st.markdown("## 🎯 Quick Assessment: Are You Ready?")
     
-    field_info = CS_FIELDS[st.session_state.chosen_field]
-    
     # Prerequisites check
     st.subheader("Prerequisites Readiness Check:")
     for prereq in field_info["prerequisites"]:
@@ -493,6 +524,9 @@ Focus on practical, industry-relevant courses from platforms like Coursera, edX,
     with col1:
         if st.button("📊 Retake Assessment"):
             st.session_state.stage = "detailed_assessment"
+            # A retake draws different curated questions while unseen ones remain
+            st.session_state.seen_questions = list(st.session_state.get("seen_questions", ())) + [
+                question.text for question in st.session_state.assessment_questions]
             st.session_state.assessment_questions = []
             st.session_state.answers = {}
             st.rerun()
@@ -504,11 +538,13 @@ Focus on practical, industry-relevant courses from platforms like Coursera, edX,
             st.session_state.answers = {}
             st.session_state.roadmap = []
             st.session_state.additional_courses = []
+            st.session_state.roadmap_timing = {}
             st.rerun()
     
     with col3:
         if st.button("📧 Save Progress"):
-            st.info("Feature coming soon! You can copy the roadmap above for now.")
+            persist_session(force=True)
+            st.success(f"Progress saved! Bookmark [this link](?sid={st.session_state.session_id}) to come back to your roadmap.")
 
 # Progress indicator
 def show_progress():
@@ -521,16 +557,38 @@ def show_progress():
 
 # Main logic
 def main():
-    show_progress()
+    with advisor_metrics.time_stage("show_progress"):
+        show_progress()
     
-    if st.session_state.stage == "choose_field":
-        choose_field()
-    elif st.session_state.stage == "assess_knowledge":
-        assess_current_knowledge()
-    elif st.session_state.stage == "detailed_assessment":
-        detailed_assessment()
-    elif st.session_state.stage == "generate_roadmap":
-        generate_comprehensive_roadmap()
+    try:
+        with advisor_metrics.time_stage(st.session_state.stage):
+            if st.session_state.stage == "choose_field":
+                choose_field()
+            elif st.session_state.stage == "assess_knowledge":
+                assess_current_knowledge()
+            elif st.session_state.stage == "detailed_assessment":
+                detailed_assessment()
+            elif st.session_state.stage == "generate_roadmap":
+                generate_comprehensive_roadmap()
+    finally:
+        # Stage transitions end in st.rerun(), which unwinds through here
+        persist_session()
+
+def record_run_timing():
+    elapsed = time.perf_counter() - RUN_STARTED
+    cpu = time.thread_time() - RUN_STARTED_CPU
+    timings = startup_timings()
+    if timings["cold_start"] is None:
+        timings["cold_start"] = elapsed
+    else:
+        timings["reruns"].append(elapsed)
+    advisor_metrics.record_rerun(st.session_state.get("stage", "unknown"), elapsed, cpu)
+    if METRICS_FILE:
+        advisor_metrics.write_prometheus_file(METRICS_FILE)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # st.rerun() and st.stop() unwind through here, so every script run is recorded
+    try:
+        main()
+    finally:
+        record_run_timing()
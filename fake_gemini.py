@@ -0,0 +1,144 @@
+"""
+Offline stand-in for google.generativeai.GenerativeModel, used by loadtest.py and for local runs.
+
+It answers the advisor's prompt kinds (assessment questions, roadmap, roadmap adjustments,
+courses) with canned output, after a configurable latency: a log-normal time-to-first-token plus
+completion tokens at a fixed token rate. Errors can be injected at a given rate with the same `code` attribute
+google.api_core exceptions use, so the dispatcher's retry logic is exercised as well.
+
+Point the Streamlit app at it with ADVISOR_FAKE_LLM=1.
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+CANNED_ROADMAP = """## 1. Foundation Phase (Weeks 1-4)
+- Review the prerequisites and set up your tooling
+- **Project:** a small end-to-end exercise
+## 2. Core Learning Phase (Weeks 5-12)
+- Work through the core topics with one course and one book
+## 3. Practical Application Phase (Weeks 13-20)
+- Build two portfolio projects
+## 4. Advanced Topics Phase (Weeks 21-28)
+- Specialise in the weakest assessed topics
+## 5. Professional Development (Weeks 29-36)
+- Contribute to open source, prepare for interviews"""
+
+CANNED_ADJUSTMENTS = """- Skim the Foundation Phase topics already rated Intermediate or above
+- Add one extra project in the Core Learning Phase for the weakest topic"""
+
+CANNED_COURSES = """### 1. Fundamentals Specialization (Coursera)
+Covers the core ideas with graded projects. ~3 months, Beginner.
+### 2. Hands-on Projects Bootcamp (Udemy)
+Project-driven practice of the key skills. ~6 weeks, Intermediate.
+### 3. Professional Certificate (edX)
+Industry-aligned capstone. ~4 months, Intermediate."""
+
+
+class FakeAPIError(Exception):
+    """Mimics google.api_core exceptions, which expose the HTTP status as `code`"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _response(text, prompt_tokens, completion_tokens=None):
+    completion_tokens = completion_tokens if completion_tokens is not None else estimate_tokens(text)
+    usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=completion_tokens,
+                            total_token_count=prompt_tokens + completion_tokens)
+    return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def canned_questions(prompt):
+    match = re.search(r"Create (\d+) multiple-choice questions", prompt)
+    count = int(match.group(1)) if match else 5
+    topics = re.search(r'"topic" is one of: (.+)', prompt)
+    topics = topics.group(1).split(", ") if topics else ["General"]
+    return json.dumps([
+        {
+            "question": f"Scenario {i + 1}: which approach fits best for {topics[i % len(topics)]}?",
+            "options": ["Option one", "Option two", "Option three", "Option four"],
+            "answer": "ABCD"[i % 4],
+            "topic": topics[i % len(topics)],
+        }
+        for i in range(count)
+    ])
+
+
+def canned_output(prompt):
+    if "multiple-choice questions" in prompt:
+        return canned_questions(prompt)
+    if "roadmap adjustments" in prompt:
+        return CANNED_ADJUSTMENTS
+    if "learning roadmap" in prompt:
+        return CANNED_ROADMAP
+    return CANNED_COURSES
+
+
+class FakeGenerativeModel:
+    def __init__(self, model_name="fake-gemini", ttft_median=0.8, ttft_sigma=0.35, tokens_per_second=120.0,
+                 error_rate=0.0, error_codes=(429, 503), time_scale=1.0, seed=None):
+        self.model_name = model_name
+        self.ttft_median = ttft_median
+        self.ttft_sigma = ttft_sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            ttft = self._rng.lognormvariate(math.log(self.ttft_median), self.ttft_sigma)
+            error = self._rng.random() < self.error_rate
+            code = self._rng.choice(self.error_codes)
+        return ttft, (FakeAPIError(code, "injected error") if error else None)
+
+    def _sleep(self, seconds, deadline):
+        seconds *= self.time_scale
+        if deadline is not None and time.monotonic() + seconds > deadline:
+            time.sleep(max(deadline - time.monotonic(), 0))
+            raise FakeAPIError(504, "deadline exceeded")
+        time.sleep(seconds)
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        timeout = (request_options or {}).get("timeout")
+        deadline = time.monotonic() + timeout if timeout else None
+        text = canned_output(prompt)
+        prompt_tokens = estimate_tokens(prompt)
+        ttft, error = self._draw()
+
+        if stream:
+            return self._stream(text, prompt_tokens, ttft, error, deadline)
+
+        self._sleep(ttft, deadline)
+        if error is not None:
+            raise error
+        self._sleep(estimate_tokens(text) / self.tokens_per_second, deadline)
+        return _response(text, prompt_tokens)
+
+    def _stream(self, text, prompt_tokens, ttft, error, deadline):
+        self._sleep(ttft, deadline)
+        if error is not None:
+            raise error
+        # Like Gemini, each chunk reports the running usage, so the last one holds the totals
+        completion_tokens = 0
+        for line in text.splitlines(keepends=True):
+            self._sleep(estimate_tokens(line) / self.tokens_per_second, deadline)
+            completion_tokens += estimate_tokens(line)
+            yield _response(line, prompt_tokens, completion_tokens)
+
+    def count_tokens(self, contents):
+        return SimpleNamespace(total_tokens=estimate_tokens(contents))
@@ -0,0 +1,148 @@
+"""
+Central dispatch for LLM traffic shared by every Streamlit session in the process:
+- single-flight: identical in-flight requests (same key) share one upstream call
+- token bucket: keeps the request rate inside the Gemini quota instead of hitting 429s
+- retries: exponential backoff with full jitter on 429 / 5xx / connection errors
+- deadlines: every request has an absolute deadline covering queueing, waiting and retries
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def is_retryable(error):
+    """Rate limits, server errors and dropped connections are worth retrying; bad requests are not"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # google.api_core exceptions carry the HTTP status as `code`
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline):
+        """Block until a token is available; returns False if that would be after `deadline` (monotonic)"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LLMDispatcher:
+    def __init__(self, requests_per_minute=None, burst=None, max_retries=4,
+                 base_delay=1.0, max_delay=20.0, default_deadline=90.0):
+        requests_per_minute = requests_per_minute or float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+        burst = burst or int(os.getenv("GEMINI_REQUEST_BURST", "10"))
+        self.bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.default_deadline = default_deadline
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "retries": 0,
+                       "failures": 0, "deadline_exceeded": 0, "throttle_wait_seconds": 0.0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def call(self, key, request, deadline=None):
+        """
+        Run `request(timeout)` under rate limiting, retries and a deadline of `deadline` seconds.
+        `timeout` is the time left for the attempt, to pass on to the client. Concurrent calls with
+        the same non-None `key` are coalesced into one upstream request.
+        """
+        deadline_at = time.monotonic() + (deadline or self.default_deadline)
+        self._count("requests")
+
+        if key is None:
+            return self._run_with_retries(request, deadline_at)
+
+        with self._lock:
+            shared = self._in_flight.get(key)
+            leader = shared is None
+            if leader:
+                shared = self._in_flight[key] = Future()
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            remaining = deadline_at - time.monotonic()
+            try:
+                return shared.result(timeout=max(remaining, 0))
+            except TimeoutError:
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded("timed out waiting for an identical in-flight request")
+
+        try:
+            result = self._run_with_retries(request, deadline_at)
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _run_with_retries(self, request, deadline_at):
+        attempt = 0
+        while True:
+            waited_from = time.monotonic()
+            if not self.bucket.acquire(deadline_at):
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded("rate limit queue would exceed the request deadline")
+            self._count("throttle_wait_seconds", time.monotonic() - waited_from)
+
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded("request deadline passed before the call was sent")
+
+            try:
+                self._count("upstream_calls")
+                return request(remaining)
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                # Full jitter keeps retries from many sessions from re-synchronising
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if time.monotonic() + delay >= deadline_at:
+                    self._count("failures")
+                    raise
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
@@ -0,0 +1,262 @@
+"""
+Concurrent-session load test for the advisor pipeline, fully offline.
+
+Simulates N users walking through the four app stages (choose_field -> assess_knowledge ->
+detailed_assessment -> generate_roadmap) against fake_gemini.FakeGenerativeModel, using the same
+cache, dispatcher and question bank code paths as chatbot.py, and reports p50/p95/p99 per stage
+plus throughput. Examples:
+
+    python loadtest.py --users 50 --sessions 4
+    python loadtest.py --users 200 --time-scale 0.05 --error-rate 0.05 --json loadtest.json
+    python loadtest.py --users 20 --max-p95 generate_roadmap=12 --max-p95 detailed_assessment=3
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import advisor_metrics
+from advisor import (CS_FIELDS, EXPERIENCE_LEVELS, KNOWLEDGE_LEVELS, AdvisorLLM, build_courses_prompt,
+                     build_roadmap_delta_prompt, build_roadmap_prompt, generate_questions)
+from fake_gemini import FakeGenerativeModel
+from llm_cache import ResponseCache
+from llm_dispatch import LLMDispatcher
+from question_bank import QuestionBank
+from quiz_engine import QuizBank, score_answers
+from roadmap_index import RoadmapIndex, describe_differences, encode_profile
+
+STAGES = ["choose_field", "assess_knowledge", "detailed_assessment", "generate_roadmap"]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class StageRecorder:
+    def __init__(self):
+        self.durations = {stage: [] for stage in STAGES}
+        self.errors = {stage: 0 for stage in STAGES}
+        self.ttft = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds, ok=True):
+        with self._lock:
+            self.durations[stage].append(seconds)
+            if not ok:
+                self.errors[stage] += 1
+
+    def record_ttft(self, seconds):
+        with self._lock:
+            self.ttft.append(seconds)
+
+    def summary(self):
+        report = {}
+        for stage in STAGES + ["roadmap_ttft"]:
+            values = sorted(self.ttft if stage == "roadmap_ttft" else self.durations[stage])
+            report[stage] = {
+                "count": len(values),
+                "errors": self.errors.get(stage, 0),
+                "mean": sum(values) / len(values) if values else None,
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "p99": percentile(values, 0.99),
+            }
+        return report
+
+
+def random_profile(rng, field, default_share):
+    """Either the untouched form (what most users submit) or a random set of slider values"""
+    field_info = CS_FIELDS[field]
+    if rng.random() < default_share:
+        return {
+            "overall_level": EXPERIENCE_LEVELS[0],
+            "topic_knowledge": {topic: KNOWLEDGE_LEVELS[0] for topic in field_info["topics"]},
+            "prereq_knowledge": {prereq: KNOWLEDGE_LEVELS[0] for prereq in field_info["prerequisites"]},
+            "additional_info": "",
+        }
+    return {
+        "overall_level": rng.choice(EXPERIENCE_LEVELS),
+        "topic_knowledge": {topic: rng.choice(KNOWLEDGE_LEVELS) for topic in field_info["topics"]},
+        "prereq_knowledge": {prereq: rng.choice(KNOWLEDGE_LEVELS) for prereq in field_info["prerequisites"]},
+        "additional_info": "",
+    }
+
+
+def run_session(llm, bank, quiz, index, executor, recorder, rng, args):
+    def think():
+        if args.think_time:
+            time.sleep(rng.uniform(0, args.think_time) * args.time_scale)
+
+    started = time.perf_counter()
+    field = rng.choice(list(CS_FIELDS))
+    recorder.record("choose_field", time.perf_counter() - started)
+    think()
+
+    started = time.perf_counter()
+    knowledge = random_profile(rng, field, args.default_profile_share)
+    recorder.record("assess_knowledge", time.perf_counter() - started)
+    think()
+
+    started = time.perf_counter()
+    try:
+        questions = generate_questions(llm, bank, field, knowledge, freshness=args.freshness, rng=rng,
+                                       quiz=quiz)
+    except Exception:
+        recorder.record("detailed_assessment", time.perf_counter() - started, ok=False)
+        return
+    recorder.record("detailed_assessment", time.perf_counter() - started)
+    answers = {}
+    for idx, question in enumerate(questions):
+        choice = rng.choice(question.options)
+        answers[idx] = {"question": question.text, "choice": choice, "correct": question.is_correct(choice),
+                        "topic": question.topic, "difficulty": question.difficulty}
+    think()
+
+    score = score_answers(answers, knowledge["overall_level"])
+
+    # Same shape as the app: courses in the pool, roadmap streamed on the session thread
+    started = time.perf_counter()
+    ok = True
+    courses = executor.submit(llm.generate_text, build_courses_prompt(field, knowledge), kind="courses")
+    match = index.nearest(field, knowledge, score) if index is not None else None
+    if match is None:
+        chunks = llm.stream_text(build_roadmap_prompt(field, knowledge, answers, score), kind="roadmap")
+    else:
+        recorder.record_ttft(time.perf_counter() - started)
+        differences = describe_differences(field, match.vector, encode_profile(field, knowledge, score))
+        chunks = iter(())
+        if differences and not args.no_delta_edits:
+            chunks = llm.stream_text(build_roadmap_delta_prompt(field, knowledge, match.roadmap, differences),
+                                     kind="roadmap_delta")
+    try:
+        first = None
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            if first is None and match is None:
+                first = time.perf_counter() - started
+                recorder.record_ttft(first)
+        if match is None and index is not None and parts:
+            index.add(field, knowledge, "".join(parts), score)
+    except Exception:
+        ok = False
+    try:
+        courses.result()
+    except Exception:
+        ok = False
+    recorder.record("generate_roadmap", time.perf_counter() - started, ok=ok)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the learning path advisor")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=3, help="sessions each user runs back to back")
+    parser.add_argument("--think-time", type=float, default=0.0, help="max seconds a user pauses between stages")
+    parser.add_argument("--default-profile-share", type=float, default=0.5,
+                        help="share of users who submit the form without moving any slider")
+    parser.add_argument("--freshness", type=float, default=0.1, help="share of sessions bypassing the question bank")
+    parser.add_argument("--ttft", type=float, default=0.8, help="median fake time to first token (s)")
+    parser.add_argument("--ttft-sigma", type=float, default=0.35, help="log-normal sigma of the fake TTFT")
+    parser.add_argument("--tokens-per-second", type=float, default=120.0, help="fake completion token rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake calls failing with 429/503")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply all fake delays (speeds up CI runs)")
+    parser.add_argument("--rpm", type=float, default=6000, help="dispatcher rate limit in requests per minute")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--bank", default=":memory:", help="question bank file (default: empty in-memory bank)")
+    parser.add_argument("--reuse-distance", type=float,
+                        help="serve roadmaps of profiles within this distance (default: no nearest-neighbour reuse)")
+    parser.add_argument("--no-delta-edits", action="store_true", help="reuse neighbour roadmaps without adjustments")
+    parser.add_argument("--no-quiz", action="store_true", help="don't serve curated quiz.txt questions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the report to this file as JSON")
+    parser.add_argument("--metrics", help="write the Prometheus metrics collected during the run to this file")
+    parser.add_argument("--max-p95", action="append", default=[], metavar="STAGE=SECONDS",
+                        help="fail (exit 1) if a stage's p95 exceeds the limit; repeatable")
+    args = parser.parse_args()
+
+    # Checked up front: a misspelled stage would otherwise never match and the gate would always pass
+    limits = []
+    for limit in args.max_p95:
+        stage, _, seconds = limit.partition("=")
+        if stage not in STAGES + ["roadmap_ttft"]:
+            parser.error(f"--max-p95: unknown stage {stage!r}, expected one of {STAGES + ['roadmap_ttft']}")
+        try:
+            limits.append((stage, float(seconds)))
+        except ValueError:
+            parser.error(f"--max-p95: expected STAGE=SECONDS, got {limit!r}")
+
+    fake_model = FakeGenerativeModel(ttft_median=args.ttft, ttft_sigma=args.ttft_sigma,
+                                     tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+                                     time_scale=args.time_scale, seed=args.seed)
+    cache = ResponseCache(":memory:", memory_entries=0 if args.no_cache else 256,
+                          max_disk_entries=0 if args.no_cache else 5000)
+    dispatcher = LLMDispatcher(requests_per_minute=args.rpm, burst=max(10, args.users),
+                               base_delay=0.5 * args.time_scale, max_delay=8 * args.time_scale)
+    llm = AdvisorLLM(lambda: fake_model, cache, dispatcher)
+    bank = QuestionBank(args.bank)
+    quiz = QuizBank() if args.no_quiz else QuizBank.load()
+    index = RoadmapIndex(":memory:", max_distance=args.reuse_distance) if args.reuse_distance is not None else None
+    recorder = StageRecorder()
+    executor = ThreadPoolExecutor(max_workers=max(8, args.users), thread_name_prefix="llm")
+
+    def user(number):
+        rng = random.Random(args.seed * 100003 + number)
+        for _ in range(args.sessions):
+            run_session(llm, bank, quiz, index, executor, recorder, rng, args)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users, thread_name_prefix="user") as users:
+        list(users.map(user, range(args.users)))
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    sessions = args.users * args.sessions
+    report = {
+        "users": args.users,
+        "sessions": sessions,
+        "elapsed_seconds": elapsed,
+        "sessions_per_second": sessions / elapsed if elapsed else None,
+        "llm_calls": fake_model.calls,
+        "stages": recorder.summary(),
+        "cache": cache.stats(),
+        "dispatcher": dispatcher.stats(),
+        "roadmap_reuse": index.stats() if index is not None else None,
+    }
+
+    print(f"{sessions} sessions by {args.users} users in {elapsed:.1f}s "
+          f"({report['sessions_per_second']:.2f} sessions/s, {fake_model.calls} LLM calls)")
+    print(f"{'stage':<22}{'count':>7}{'errors':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for stage, stats in report["stages"].items():
+        fmt = lambda value: f"{value:9.3f}" if value is not None else f"{'-':>9}"
+        print(f"{stage:<22}{stats['count']:>7}{stats['errors']:>8}{fmt(stats['p50'])}{fmt(stats['p95'])}{fmt(stats['p99'])}")
+    print(f"cache hit rate {report['cache']['hit_rate']:.0%}, "
+          f"coalesced {report['dispatcher']['coalesced']}, retries {report['dispatcher']['retries']}")
+    if index is not None:
+        reuse = report["roadmap_reuse"]
+        print(f"roadmap reuse hit rate {reuse['hit_rate']:.0%} "
+              f"({reuse['exact_hits']} exact, {reuse['near_hits']} near, {reuse['entries']} stored)")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.metrics:
+        advisor_metrics.export_cache_stats(cache)
+        advisor_metrics.write_prometheus_file(args.metrics, min_interval=0)
+
+    failed = False
+    for stage, seconds in limits:
+        p95 = report["stages"][stage]["p95"]
+        if p95 is not None and p95 > seconds:
+            print(f"FAIL: {stage} p95 {p95:.3f}s > {seconds:.3f}s")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
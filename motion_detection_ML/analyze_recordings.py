@@ -0,0 +1,279 @@
+"""
+Motion timelines for recorded mock interviews.
+
+    python analyze_recordings.py recordings/*.mp4 --out-dir motion_reports
+    python analyze_recordings.py interview.webm --baseline static --calibration-seconds 5 --keep-frames
+    python analyze_recordings.py interview.webm --backend mog2
+
+Each video is split into chunks of `--chunk-seconds` that are decoded in parallel, one process per
+core. A chunk worker seeks to its first frame, resizes every frame straight into a memory-mapped
+(N, 64, 64, 3) uint8 array (the model's input size) and reduces it to channel-mean features in a
+second memmap, so nothing frame-sized is pickled between processes.
+
+The baseline is inherently sequential (each frame adapts it for the next), so it is applied in a
+single pass over the feature rows once all chunks are done. That pass is cheap, and the baseline
+carries over chunk boundaries exactly as it would in one uninterrupted run. The other
+motion_backends engines (--backend diff / grid / mog2 / cnn) score the 64x64 frames in the same
+single pass.
+
+For every video, <out-dir>/<name>.npz holds the per-frame timeline (time, movement, confidence,
+x, y) and <name>.json the summary (movement share, movement events, speed vs real time). Videos
+that share a file name get the hash of their path appended to <name>.
+With --keep-frames the frame memmap stays in --work-dir (default .cache/motion_frames) together
+with a marker recording how many frames were decoded, and is reused instead of re-decoding. A
+memmap without the marker (an interrupted run) is decoded again.
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from motion_backends import BACKENDS, create_backend
+from motion_detection import FRAME_SIZE, MotionDetectionModel
+
+FRAME_SHAPE = FRAME_SIZE[::-1] + (3,)
+KEEP_DIR = os.path.join(".cache", "motion_frames")
+
+
+def probe(path):
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise SystemExit(f"could not open {path!r}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    capture.release()
+    if count <= 0:
+        raise SystemExit(f"{path!r} does not report a frame count; re-encode it to a seekable container")
+    return fps, count
+
+
+def _work_paths(path, work_dir):
+    # Keyed on the file's identity, so a changed recording is never matched with stale frames
+    stat = os.stat(path)
+    key = zlib.crc32(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+    stem = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.join(work_dir, f"{stem}-{key:08x}")
+    return base + ".frames.npy", base + ".features.npy", base + ".done.json"
+
+
+def _decoded_frames(done_path):
+    """Frames in a finished frame memmap, from its marker; None if decoding never completed"""
+    try:
+        with open(done_path) as f:
+            return int(json.load(f)["frames"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def output_stems(paths):
+    """Report names for `paths`: the file name, plus a hash of the full path where names collide"""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    repeated = {stem for stem in stems if stems.count(stem) > 1}
+    return [f"{stem}-{zlib.crc32(os.path.abspath(path).encode()):08x}" if stem in repeated else stem
+            for stem, path in zip(stems, paths)]
+
+
+def _chunk_worker(path, frames_path, features_path, start, stop, decode):
+    """Fill frames/features rows [start, stop); returns how many frames were actually available"""
+    frames = np.load(frames_path, mmap_mode="r+" if decode else "r")
+    features = np.load(features_path, mmap_mode="r+")
+    model = MotionDetectionModel()
+    if not decode:
+        for i in range(start, stop):
+            model.channel_means(frames[i], out=features[i])
+        return stop - start
+
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+    i = start
+    while i < stop:
+        ok, image = capture.read()
+        if not ok:
+            break
+        cv2.resize(image, FRAME_SIZE, dst=frames[i], interpolation=cv2.INTER_AREA)  # as fit_frame does for live frames
+        model.channel_means(frames[i], out=features[i])
+        i += 1
+    capture.release()
+    frames.flush()
+    features.flush()
+    return i - start
+
+
+def extract(path, executor, work_dir, chunk_seconds):
+    """Start decoding `path` in chunks; returns a callable giving (fps, frames memmap, features memmap)"""
+    fps, count = probe(path)
+    frames_path, features_path, done_path = _work_paths(path, work_dir)
+    decoded = _decoded_frames(done_path) if os.path.exists(frames_path) else None
+    decode = decoded is None
+    if decode:
+        if os.path.exists(done_path):
+            os.remove(done_path)
+        np.lib.format.open_memmap(frames_path, mode="w+", dtype=np.uint8, shape=(count,) + FRAME_SHAPE).flush()
+    else:
+        count = decoded
+    np.lib.format.open_memmap(features_path, mode="w+", dtype=np.float64, shape=(count, 3)).flush()
+
+    chunk = max(int(chunk_seconds * fps), 1)
+    ranges = [(start, min(start + chunk, count)) for start in range(0, count, chunk)]
+    futures = [executor.submit(_chunk_worker, path, frames_path, features_path, start, stop, decode)
+               for start, stop in ranges]
+
+    def result():
+        decoded = [future.result() for future in futures]
+        # Containers can over-report their frame count: keep the frames up to the first gap
+        available = 0
+        for (start, stop), n in zip(ranges, decoded):
+            available = start + n
+            if n < stop - start:
+                break
+        if decode:
+            # Written last, so frames are only reused once every chunk made it to disk
+            with open(done_path, "w") as f:
+                json.dump({"frames": available}, f)
+        frames = np.load(frames_path, mmap_mode="r")[:available]
+        features = np.load(features_path, mmap_mode="r")[:available]
+        return fps, frames, features
+
+    return result
+
+
+def create_detector(args):
+    """The --backend engine, working at the memmap's frame size"""
+    if args.backend == "cnn":
+        return create_backend("cnn", weights=args.weights, runtime=args.runtime)
+    if args.backend == "mean":
+        return create_backend("mean", baseline=args.baseline, alpha=args.alpha, window=args.window,
+                              warmup_frames=args.warmup_frames)
+    return create_backend(args.backend, size=FRAME_SIZE)
+
+
+def score(frames, features, fps, args):
+    """Per-frame timeline columns, in one sequential pass over the features (or frames)"""
+    n = len(features)
+    if args.backend == "mean" and args.baseline == "static":
+        model = MotionDetectionModel()
+        model.calibrate_batch(frames[:max(int(args.calibration_seconds * fps), 1)])
+        # In blocks, so hours of footage never sit in memory at once
+        blocks = [model.detect_movement_batch(frames[start:start + 4096]) for start in range(0, n, 4096)]
+        join = lambda column: np.concatenate([column(block) for block in blocks]) if blocks else np.zeros(0)
+        return (join(lambda block: block["movement_detected"]).astype(bool),
+                join(lambda block: block["confidence"]).astype(np.float32),
+                join(lambda block: block["position_change"]["x"]).astype(np.float32),
+                join(lambda block: block["position_change"]["y"]).astype(np.float32))
+
+    detector = create_detector(args)
+    # The mean backend only needs the channel means the chunk workers already computed
+    rows, predict = (features, detector.score) if args.backend == "mean" else (frames, detector.detect_movement)
+    movement = np.zeros(n, dtype=bool)
+    confidence, x, y = (np.zeros(n, dtype=np.float32) for _ in range(3))
+    for i, row in enumerate(rows):
+        prediction = predict(row)
+        movement[i] = prediction['movement_detected']
+        confidence[i] = prediction['confidence']
+        x[i] = prediction['position_change']['x']
+        y[i] = prediction['position_change']['y']
+    return movement, confidence, x, y
+
+
+def movement_events(movement, fps, min_seconds):
+    """(start_seconds, duration_seconds) of each run of moving frames lasting at least `min_seconds`"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], movement.view(np.int8), [0]))))
+    starts, stops = edges[::2], edges[1::2]
+    keep = (stops - starts) >= max(min_seconds * fps, 1)
+    return [(start / fps, (stop - start) / fps) for start, stop in zip(starts[keep], stops[keep])]
+
+
+def summarize(path, fps, movement, confidence, min_event_seconds, processing_seconds):
+    n = len(movement)
+    duration = n / fps
+    events = movement_events(movement, fps, min_event_seconds)
+    return {
+        "video": path,
+        "frames": n,
+        "fps": fps,
+        "duration_seconds": round(duration, 2),
+        "moving_seconds": round(float(movement.sum()) / fps, 2),
+        "moving_share": round(float(movement.mean()), 4) if n else 0.0,
+        "events": len(events),
+        "longest_event_seconds": round(max((length for _, length in events), default=0.0), 2),
+        "event_starts_seconds": [round(start, 2) for start, _ in events],
+        "max_confidence": round(float(confidence.max()), 3) if n else 0.0,
+        "processing_seconds": round(processing_seconds, 2),
+        "realtime_factor": round(duration / processing_seconds, 1) if processing_seconds else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame motion timelines for recorded interview videos")
+    parser.add_argument("videos", nargs="+")
+    parser.add_argument("--out-dir", default="motion_reports")
+    parser.add_argument("--workers", type=int, default=None, help="decoding processes (default: all cores)")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0, help="video length per parallel chunk")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mean",
+                        help="detection engine (see motion_backends.py)")
+    parser.add_argument("--weights", help="trained Keras weights for --backend cnn")
+    parser.add_argument("--runtime", help="TFLite/ONNX export for --backend cnn (see motion_runtime.py)")
+    parser.add_argument("--baseline", choices=["ewma", "ring", "static"], default="ewma",
+                        help="for --backend mean: adaptive baseline (see motion_baseline.py) or one-off "
+                             "calibration at the start")
+    parser.add_argument("--alpha", type=float, default=0.02)
+    parser.add_argument("--window", type=int, default=300)
+    parser.add_argument("--warmup-frames", type=int, default=45)
+    parser.add_argument("--calibration-seconds", type=float, default=3.0, help="for --baseline static")
+    parser.add_argument("--min-event-seconds", type=float, default=0.3, help="shortest movement counted as an event")
+    parser.add_argument("--work-dir", help="where frame memmaps are written (default: a temporary directory, "
+                                           f"or {KEEP_DIR} with --keep-frames)")
+    parser.add_argument("--keep-frames", action="store_true", help="keep the frame memmaps for later runs")
+    args = parser.parse_args()
+    if args.backend == "cnn" and not (args.weights or args.runtime):
+        parser.error("--backend cnn needs --weights or --runtime")
+    if args.backend != "mean" and args.baseline == "static":
+        parser.error("--baseline static only applies to --backend mean")
+
+    videos = list(dict.fromkeys(args.videos))
+    os.makedirs(args.out_dir, exist_ok=True)
+    # Kept frames must be found again by the next run, so they never go to a fresh temporary directory
+    work_dir = args.work_dir or (KEEP_DIR if args.keep_frames else tempfile.mkdtemp(prefix="motion-frames-"))
+    os.makedirs(work_dir, exist_ok=True)
+    started = time.perf_counter()
+    footage = 0.0
+    try:
+        with ProcessPoolExecutor(args.workers) as executor:
+            # Every video's chunks are queued up front, so the pool stays busy across files
+            pending = [(path, stem, time.perf_counter(), extract(path, executor, work_dir, args.chunk_seconds))
+                       for path, stem in zip(videos, output_stems(videos))]
+            for path, stem, submitted, result in pending:
+                fps, frames, features = result()
+                movement, confidence, x, y = score(frames, features, fps, args)
+                np.savez_compressed(os.path.join(args.out_dir, f"{stem}.npz"),
+                                    time=(np.arange(len(movement)) / fps).astype(np.float32),
+                                    movement=movement, confidence=confidence, x=x, y=y, fps=fps)
+                summary = summarize(path, fps, movement, confidence, args.min_event_seconds,
+                                    time.perf_counter() - submitted)
+                footage += summary["duration_seconds"]
+                with open(os.path.join(args.out_dir, f"{stem}.json"), "w") as f:
+                    json.dump(summary, f, indent=2)
+                print(f"{path}: {summary['duration_seconds']:.0f}s, moving {summary['moving_share']:.1%} "
+                      f"in {summary['events']} events · {summary['realtime_factor']}x real time")
+                del frames, features
+                frames_path, features_path, done_path = _work_paths(path, work_dir)
+                if not args.keep_frames:
+                    os.remove(frames_path)
+                    os.remove(done_path)
+                os.remove(features_path)
+    finally:
+        if not args.keep_frames and not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - started
+    print(f"{len(videos)} videos, {footage:.0f}s of footage in {elapsed:.1f}s ({footage / elapsed:.1f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
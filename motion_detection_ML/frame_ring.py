@@ -0,0 +1,111 @@
+"""
+Shared-memory ring of fixed-size frames, for handing frames between processes without pickling.
+
+Sending a 640x480 frame through a multiprocessing queue or pipe pickles and copies about 1 MB.
+With a FrameRing the writer copies the frame into a slot once (or captures straight into it),
+and only the slot index crosses the process boundary:
+
+    ring = FrameRing(slots=64, shape=(480, 640, 3))          # writer process creates it
+    index = ring.put(frame)                                   # None when every slot is in use
+    queue.put(index)
+
+    reader = FrameRing.attach(ring.spec)                      # reader process
+    frame = reader.get(queue.get())                           # view into shared memory, no copy
+    ...                                                        # use it, then give the slot back
+    reader.release(index)
+
+Slots cycle FREE -> WRITING (acquired) -> READY (published) -> FREE (released). Each transition is
+made by the slot's current owner, so a one-byte state per slot is enough and no cross-process
+lock is needed. All slots are acquired in one process (any number of its threads); any process
+may release.
+"""
+import sys
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FREE, WRITING, READY = 0, 1, 2
+_HEADER_ALIGN = 64  # frames start on a cache-line boundary after the slot states
+
+
+class FrameRing:
+    def __init__(self, slots, shape, dtype=np.uint8, name=None, create=True):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        header = -(-slots // _HEADER_ALIGN) * _HEADER_ALIGN
+        size = header + slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        if create:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        elif sys.version_info >= (3, 13):
+            # Only the creator may unlink the block; readers must not track it
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            # Before 3.13 attaching always registers with the resource tracker. Children started by
+            # multiprocessing share the creator's tracker, so that is harmless there; an unrelated
+            # reader process would unlink the block when it exits.
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._owner = create
+        self.states = np.ndarray((slots,), dtype=np.uint8, buffer=self._shm.buf)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf, offset=header)
+        if create:
+            self.states[:] = FREE
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @property
+    def spec(self):
+        """Picklable description for FrameRing.attach() in another process"""
+        return self.name, self.slots, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, slots, shape, dtype = spec
+        return cls(slots, shape, dtype, name=name, create=False)
+
+    def acquire(self):
+        """Index of a free slot, now owned by the caller, or None when every slot is in use"""
+        with self._lock:
+            for step in range(self.slots):
+                index = (self._next + step) % self.slots
+                if self.states[index] == FREE:
+                    self.states[index] = WRITING
+                    self._next = (index + 1) % self.slots
+                    return index
+        return None
+
+    def publish(self, index):
+        self.states[index] = READY
+
+    def put(self, frame):
+        """Copy `frame` into a free slot and publish it; returns the slot index, or None if the ring is full"""
+        index = self.acquire()
+        if index is not None:
+            np.copyto(self.frames[index], frame)
+            self.publish(index)
+        return index
+
+    def get(self, index):
+        """The frame in slot `index`, as a view that stays valid until the slot is released"""
+        return self.frames[index]
+
+    def release(self, index):
+        self.states[index] = FREE
+
+    def in_use(self):
+        return int(np.count_nonzero(self.states))
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        self.states = self.frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
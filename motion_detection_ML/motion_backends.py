@@ -0,0 +1,253 @@
+"""
+Interchangeable motion detection engines, so each deployment can trade accuracy against CPU.
+
+Every backend has detect_movement(frame) returning the same prediction dict as
+MotionDetectionModel ('movement_detected', 'confidence' in 0-1, 'position_change' {'x', 'y'}).
+For the pixel-based engines, position_change is the centre of the detected motion relative to the
+frame centre, in -1..1. Backends with an `input_size` get frames already resized to it by
+MotionPipeline.
+
+    diff  downsampled grayscale frame differencing (cheapest)
+    grid  motion energy per grid cell, optionally weighted to a region of interest
+    mog2  OpenCV MOG2 background subtraction (robust to noise, a little more CPU)
+    mean  channel means against an adaptive baseline (motion_baseline.MotionMonitor)
+    cnn   MotionDetectionModel's CNN (needs trained weights; Keras, or a TFLite/ONNX export
+          from motion_runtime.py that runs without TensorFlow)
+"""
+import cv2
+import numpy as np
+
+from motion_detection import describe_movement
+
+DEFAULT_SIZE = (80, 60)  # (width, height) the pixel-based engines work at
+
+
+def _still():
+    return {'movement_detected': False, 'confidence': 0.0, 'position_change': {'x': 0.0, 'y': 0.0}}
+
+
+class MotionBackend:
+    name = None
+    input_size = DEFAULT_SIZE
+
+    def __init__(self, movement_threshold=0.5):
+        self.movement_threshold = movement_threshold
+
+    def calibrate(self, initial_frames):
+        """Prime the engine with frames of the still scene"""
+        for frame in initial_frames:
+            self.detect_movement(frame)
+
+    def detect_movement(self, current_frame):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget the scene seen so far, e.g. after the camera moved"""
+
+    def get_movement_analysis(self, frame):
+        return describe_movement(self.detect_movement(frame))
+
+    def _prediction(self, confidence, x=0.0, y=0.0):
+        confidence = float(np.clip(confidence, 0, 1))
+        return {
+            'movement_detected': confidence > self.movement_threshold,
+            'confidence': confidence,
+            'position_change': {'x': float(x), 'y': float(y)},
+        }
+
+    def _small_gray(self, frame):
+        if frame.shape[1::-1] != self.input_size:
+            frame = cv2.resize(frame, self.input_size, interpolation=cv2.INTER_AREA)
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
+
+    def _mask_prediction(self, mask, full_scale):
+        """Prediction from a boolean motion mask: share of moving pixels and their centroid"""
+        changed = np.count_nonzero(mask)
+        if not changed:
+            return self._prediction(0.0)
+        moments = cv2.moments(mask.view(np.uint8), binaryImage=True)
+        height, width = mask.shape
+        x = moments["m10"] / moments["m00"] / (width / 2) - 1
+        y = moments["m01"] / moments["m00"] / (height / 2) - 1
+        return self._prediction(changed / mask.size / full_scale, x, y)
+
+
+class FrameDiffBackend(MotionBackend):
+    """Pixels whose grayscale value changed by more than `pixel_threshold` since the previous frame"""
+    name = "diff"
+
+    def __init__(self, size=DEFAULT_SIZE, pixel_threshold=25, full_scale=0.02, movement_threshold=0.5):
+        super().__init__(movement_threshold)
+        self.input_size = tuple(size)
+        self.pixel_threshold = pixel_threshold
+        self.full_scale = full_scale  # share of changed pixels that counts as confidence 1.0
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def detect_movement(self, current_frame):
+        gray = self._small_gray(current_frame)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return _still()
+        return self._mask_prediction(cv2.absdiff(gray, previous) > self.pixel_threshold, self.full_scale)
+
+
+class GridEnergyBackend(MotionBackend):
+    """
+    Mean absolute frame difference per cell of a rows x cols grid. `roi_weights` (rows x cols)
+    emphasises or masks out cells, e.g. to watch only the head and shoulders region.
+    """
+    name = "grid"
+
+    def __init__(self, grid=(4, 4), size=DEFAULT_SIZE, roi_weights=None, full_scale=4.0, movement_threshold=0.5):
+        super().__init__(movement_threshold)
+        self.grid = tuple(grid)
+        self.input_size = tuple(size)
+        self.full_scale = full_scale  # mean grey-level change in the busiest cell that counts as 1.0
+        self.roi_weights = np.ones(self.grid, dtype=np.float32) if roi_weights is None else \
+            np.asarray(roi_weights, dtype=np.float32).reshape(self.grid)
+        rows, cols = self.grid
+        # Cell centres in -1..1 for the energy-weighted position
+        self._cell_x = np.tile((np.arange(cols) + 0.5) / cols * 2 - 1, (rows, 1)).astype(np.float32)
+        self._cell_y = np.tile(((np.arange(rows) + 0.5) / rows * 2 - 1)[:, None], (1, cols)).astype(np.float32)
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def detect_movement(self, current_frame):
+        gray = self._small_gray(current_frame)
+        previous, self._previous = self._previous, gray
+        if previous is None:
+            return _still()
+        rows, cols = self.grid
+        cell_h, cell_w = gray.shape[0] // rows, gray.shape[1] // cols
+        diff = cv2.absdiff(gray, previous)[:rows * cell_h, :cols * cell_w]
+        energy = diff.reshape(rows, cell_h, cols, cell_w).mean(axis=(1, 3), dtype=np.float32)
+        energy *= self.roi_weights
+        total = energy.sum()
+        if not total:
+            return self._prediction(0.0)
+        x = (energy * self._cell_x).sum() / total
+        y = (energy * self._cell_y).sum() / total
+        return self._prediction(energy.max() / self.full_scale, x, y)
+
+
+class MOG2Backend(MotionBackend):
+    """Foreground share from OpenCV's adaptive Gaussian-mixture background model"""
+    name = "mog2"
+
+    def __init__(self, size=DEFAULT_SIZE, history=300, var_threshold=32, full_scale=0.02, movement_threshold=0.5):
+        super().__init__(movement_threshold)
+        self.input_size = tuple(size)
+        self.full_scale = full_scale
+        self._options = {"history": history, "varThreshold": var_threshold, "detectShadows": False}
+        self.reset()
+
+    def reset(self):
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(**self._options)
+        self._primed = False
+
+    def calibrate(self, initial_frames):
+        for frame in initial_frames:
+            self._subtractor.apply(self._small_gray(frame))
+            self._primed = True
+
+    def detect_movement(self, current_frame):
+        foreground = self._subtractor.apply(self._small_gray(current_frame))
+        primed, self._primed = self._primed, True
+        if not primed:
+            return _still()  # the first frame is all foreground: there is no background to compare with yet
+        return self._mask_prediction(foreground > 0, self.full_scale)
+
+
+class CNNBackend(MotionBackend):
+    """
+    Heavy mode: MotionDetectionModel's CNN, whose class 0 is "moving". It is only meaningful with
+    trained `weights` (Keras, imports TensorFlow) or a `runtime` export (.tflite / .onnx, see
+    motion_runtime.py), which loads in milliseconds and never imports TensorFlow.
+    """
+    name = "cnn"
+
+    def __init__(self, weights=None, runtime=None, movement_threshold=0.85):
+        from motion_detection import FRAME_SIZE, MotionDetectionModel
+
+        if not weights and not runtime:
+            # An untrained CNN outputs noise that would be reported as movement verdicts
+            raise ValueError("the cnn backend needs trained weights or a runtime export (.tflite / .onnx)")
+        super().__init__(movement_threshold)
+        self.input_size = FRAME_SIZE
+        self.model = MotionDetectionModel()
+        if runtime:
+            from motion_runtime import load_classifier
+
+            self._predict = load_classifier(runtime).predict
+        else:
+            self.model.model.load_weights(weights)
+            keras_model = self.model.model
+            self._predict = lambda batch: keras_model(batch, training=False)
+        self._batch = np.empty((1,) + FRAME_SIZE[::-1] + (3,), dtype=np.float32)  # reused input tensor
+
+    def calibrate(self, initial_frames):
+        pass
+
+    def detect_movement(self, current_frame):
+        self.model.preprocess_frame(current_frame, out=self._batch[0])
+        probabilities = np.asarray(self._predict(self._batch))[0]
+        return self._prediction(probabilities[0])
+
+
+class MeanBackend(MotionBackend):
+    """
+    The original channel-mean detector behind an adaptive baseline (motion_baseline.MotionMonitor).
+    calibrate() warms the baseline up on the given frames; score() takes precomputed channel means,
+    for callers that extract features in batches or in other processes.
+    """
+    name = "mean"
+
+    def __init__(self, baseline="ewma", alpha=0.02, window=300, warmup_frames=45, movement_threshold=0.85):
+        from motion_baseline import MotionMonitor, RollingBaseline
+        from motion_detection import FRAME_SIZE, MotionDetectionModel
+
+        super().__init__(movement_threshold)
+        self.input_size = FRAME_SIZE
+        model = MotionDetectionModel()
+        model.movement_threshold = movement_threshold
+        self.monitor = MotionMonitor(model, RollingBaseline(3, mode=baseline, alpha=alpha, window=window),
+                                     warmup_frames=warmup_frames)
+
+    @property
+    def state(self):
+        return self.monitor.state
+
+    @property
+    def warmup_frames(self):
+        return self.monitor.warmup_frames
+
+    def reset(self):
+        self.monitor.reset()
+
+    def score(self, features):
+        return self.monitor.score(features)
+
+    def detect_movement(self, current_frame):
+        return self.monitor.detect_movement(current_frame)
+
+
+BACKENDS = {
+    "diff": FrameDiffBackend,
+    "grid": GridEnergyBackend,
+    "mog2": MOG2Backend,
+    "mean": MeanBackend,
+    "cnn": CNNBackend,
+}
+
+
+def create_backend(name, **options):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown motion backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**options)
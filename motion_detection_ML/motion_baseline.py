@@ -0,0 +1,171 @@
+"""
+Adaptive baseline for motion detection.
+
+MotionDetectionModel.calibrate() fixes the baseline once, so slow lighting drift over a long
+session ends up reported as movement. RollingBaseline instead keeps the mean and variance of
+the feature vectors up to date frame by frame, with constant time and memory per update:
+
+- "ewma": exponentially weighted mean/variance; `alpha` sets how fast it follows drift
+- "ring": exact mean/variance over the last `window` frames, from running sums over a
+  preallocated ring buffer
+
+MotionMonitor puts a warm-up state machine in front of it. The first `warmup_frames` frames
+build the baseline (nothing is flagged). After that, frames are scored against it, and only
+still frames keep adapting it, so a person moving is never absorbed into the baseline.
+
+Overall brightness is divided out of the features first. Exposure changes and the room light
+dimming or brightening scale all channel means by the same factor; scored against the baseline,
+that drift would soon be flagged, and flagged frames no longer adapt it, so it would stay flagged.
+Brightness is scored separately, as the jump from a short running average (`brightness_alpha`)
+that follows every frame: someone in grey or dark clothes moving is caught when it happens, while
+slow drift, and a lamp switched on after a few frames, are absorbed. A change in the scene's
+colour balance is still flagged until reset() starts a new warm-up.
+"""
+import numpy as np
+
+WARMING_UP = "warming_up"
+MONITORING = "monitoring"
+
+
+class RollingBaseline:
+    def __init__(self, dim, mode="ewma", alpha=0.02, window=300):
+        if mode not in ("ewma", "ring"):
+            raise ValueError(f"unknown baseline mode {mode!r}, expected 'ewma' or 'ring'")
+        self.dim = dim
+        self.mode = mode
+        self.alpha = alpha
+        self.window = window
+        self.mean = np.zeros(dim)
+        self.var = np.zeros(dim)
+        self.count = 0
+        self._delta = np.empty(dim)  # scratch buffers, so updates don't allocate
+        self._scratch = np.empty(dim)
+        if mode == "ring":
+            self._ring = np.empty((window, dim))
+            self._sum = np.zeros(dim)
+            self._sumsq = np.zeros(dim)
+            self._pos = 0
+            self._since_resync = 0
+
+    def reset(self):
+        self.mean.fill(0)
+        self.var.fill(0)
+        self.count = 0
+        if self.mode == "ring":
+            self._sum.fill(0)
+            self._sumsq.fill(0)
+            self._pos = 0
+            self._since_resync = 0
+
+    def update(self, features):
+        if self.mode == "ewma":
+            self._update_ewma(features)
+        else:
+            self._update_ring(features)
+
+    def _update_ewma(self, features):
+        self.count += 1
+        # Plain running average until 1/n drops below alpha, so early frames aren't biased towards zero
+        alpha = max(self.alpha, 1.0 / self.count)
+        delta = np.subtract(features, self.mean, out=self._delta)
+        self.mean += np.multiply(delta, alpha, out=self._scratch)
+        delta *= delta
+        delta *= alpha
+        self.var += delta
+        self.var *= 1 - alpha
+
+    def _update_ring(self, features):
+        slot = self._ring[self._pos]
+        if self.count == self.window:
+            self._sum -= slot
+            self._sumsq -= np.multiply(slot, slot, out=self._scratch)
+        else:
+            self.count += 1
+        slot[:] = features
+        self._sum += slot
+        self._sumsq += np.multiply(slot, slot, out=self._scratch)
+        self._pos = (self._pos + 1) % self.window
+
+        # Running sums drift with rounding; rebuilding them once per window keeps the cost O(1) amortised
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._since_resync = 0
+            filled = self._ring[:self.count]
+            np.sum(filled, axis=0, out=self._sum)
+            np.einsum("ij,ij->j", filled, filled, out=self._sumsq)
+
+        np.divide(self._sum, self.count, out=self.mean)
+        np.divide(self._sumsq, self.count, out=self.var)
+        self.var -= np.multiply(self.mean, self.mean, out=self._scratch)
+        np.maximum(self.var, 0, out=self.var)
+
+    def std(self, min_std=0.0):
+        return np.maximum(np.sqrt(self.var), min_std)
+
+
+class MotionMonitor:
+    """
+    Scores frames with a MotionDetectionModel's features against a RollingBaseline. It exposes
+    detect_movement() with the same prediction dict, so it can stand in for the model (e.g. in
+    MotionPipeline). `min_std` keeps a near-static scene's tiny variance from turning sensor noise
+    into movement. A brightness jump of `brightness_full_scale` (relative) scores 1.0;
+    `brightness_alpha=None` scores raw channel means against the baseline instead.
+    """
+
+    def __init__(self, model, baseline=None, warmup_frames=45, min_std=0.02, brightness_alpha=0.05,
+                 brightness_full_scale=0.1):
+        self.model = model
+        self.baseline = baseline or RollingBaseline(3)
+        self.warmup_frames = warmup_frames
+        self.min_std = min_std
+        self.brightness_alpha = brightness_alpha
+        self.brightness_full_scale = brightness_full_scale
+        self.state = WARMING_UP
+        self._warmup_seen = 0
+        self._brightness = None  # running average of the frames' mean level
+        self._features = np.empty(self.baseline.dim)
+        self._normalized = np.empty(self.baseline.dim)
+
+    def reset(self):
+        """Start a new warm-up, e.g. after the camera or the person's seat changed"""
+        self.baseline.reset()
+        self.state = WARMING_UP
+        self._warmup_seen = 0
+        self._brightness = None
+
+    def _brightness_jump(self, level):
+        """Relative change of `level` from the running average, which then takes it in"""
+        if self._brightness is None:
+            self._brightness = level
+        jump = abs(level - self._brightness) / self._brightness
+        self._brightness += self.brightness_alpha * (level - self._brightness)
+        return jump
+
+    def detect_movement(self, current_frame):
+        return self.score(self.model.channel_means(np.asarray(current_frame), out=self._features))
+
+    def score(self, features):
+        """Prediction for one frame's raw channel means (lets callers compute features in batches)"""
+        brightness_score = 0.0
+        if self.brightness_alpha:
+            # Channel shares relative to the frame's mean level (floored, so a black frame stays finite)
+            level = max(float(np.mean(features)), 1e-3)
+            brightness_score = self._brightness_jump(level) / self.brightness_full_scale
+            features = np.divide(features, level, out=self._normalized)
+        if self.state == WARMING_UP:
+            self.baseline.update(features)
+            self._warmup_seen += 1
+            if self._warmup_seen >= self.warmup_frames:
+                self.state = MONITORING
+            return {'movement_detected': False, 'confidence': 0.0, 'position_change': {'x': 0.0, 'y': 0.0}}
+
+        delta = (features - self.baseline.mean) / self.baseline.std(self.min_std)
+        movement_score = float(np.clip(max(np.abs(delta).mean() * 2, brightness_score), 0, 1))  # Scale difference to 0-1
+        movement_detected = movement_score > self.model.movement_threshold
+        if not movement_detected:
+            self.baseline.update(features)
+        return {
+            'movement_detected': movement_detected,
+            'confidence': movement_score,
+            'position_change': {'x': float(delta[0]), 'y': float(delta[1])},
+        }
@@ -0,0 +1,325 @@
+"""
+Benchmarks for motion detection: speed, memory and accuracy on deterministic synthetic video.
+
+    python motion_benchmark.py                          # full run, 320x240 / 640x480 / 1280x720
+    python motion_benchmark.py --quick                  # 320x240 only, shorter clips
+    python motion_benchmark.py --save-baseline          # record this machine's numbers
+    python motion_benchmark.py --compare                # exit 1 if anything regressed vs the baseline
+
+The generator draws a seated "candidate" (head and shoulders) on a textured background with
+sensor noise. Every clip starts with a still stretch for calibration/warm-up and then follows a
+scenario:
+
+    static       nothing moves
+    drift        lighting dims by DRIFT_PER_SECOND, 1% of the brightness per second (must not count
+                 as movement); the rate does not depend on the clip length
+    small_moves  brief small shifts out and back at known frames
+    large_moves  brief large lean-outs at known frames
+
+Reported per resolution:
+- stage timings of MotionDetectionModel: preprocess_frame, extract_features, calibrate,
+  detect_movement (p50 / p95 ms per call)
+- for each strategy (static calibration, adaptive mean, diff, grid, mog2): throughput (from the
+  median per-frame time) and per-frame precision / recall / F1 against the generator's ground
+  truth, per scenario
+- peak RSS of the process
+
+--compare fails when a timing is more than 25% worse, peak RSS more than 25% higher or an F1
+score more than 0.05 lower than the saved baseline. Baselines are only comparable on the same
+machine; on shared or throttled CI runners raise --time-tolerance.
+
+Detector limits that are known and accepted are listed in KNOWN_FAILURES with the reason; they are
+marked in the report (and in the JSON as "known_failure"), so an F1 of 0.00 there is not mistaken
+for a regression or for a passing gate. The report says when one of them starts passing.
+
+Frames within `TOLERANCE_FRAMES` after a movement ends are not scored either way, since detectors
+legitimately lag by a frame or two. The CNN backend needs TensorFlow and trained weights, so it is
+not part of the comparison.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from motion_backends import create_backend
+from motion_detection import MotionDetectionModel
+
+RESOLUTIONS = {"320x240": (320, 240), "640x480": (640, 480), "1280x720": (1280, 720)}
+SCENARIOS = ("static", "drift", "small_moves", "large_moves")
+STRATEGIES = ("static", "mean", "diff", "grid", "mog2")
+FPS = 15
+STILL_SECONDS = 4  # calibration / warm-up stretch at the start of every clip
+DRIFT_PER_SECOND = 0.01  # share of the brightness lost per second in the drift scenario
+TOLERANCE_FRAMES = 2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "motion_benchmark_baseline.json")
+
+# (scenario, strategy) pairs expected to score badly, with the reason
+KNOWN_FAILURES = {
+    # Calibrating once is what the static strategy is for; drift is what the adaptive "mean" is for,
+    # and it is gated here like every other engine
+    ("drift", "static"): "one-off calibration cannot follow lighting changes",
+    # The shift moves the channel means by under 0.001, far below the 0.02 noise floor (min_std /
+    # MIN_FEATURE_STD); the pixel engines are the ones meant to catch small moves
+    ("small_moves", "static"): "a 4% shift changes the channel means by less than sensor noise",
+    ("small_moves", "mean"): "a 4% shift changes the channel means by less than sensor noise",
+}
+KNOWN_FAILURE_F1 = 0.5  # a known failure scoring at least this is reported as passing now
+
+# Allowed regressions against a saved baseline
+TOLERANCES = {"time": 0.25, "memory": 0.25, "quality": 0.05}
+
+
+class SyntheticClip:
+    """
+    Deterministic frames and ground truth for one scenario at one resolution. Frames are drawn on
+    demand (a 720p clip would not fit comfortably in memory), identically on every run.
+    """
+
+    def __init__(self, scenario, size, seconds=12, fps=FPS, seed=0):
+        self.scenario = scenario
+        self.size = size
+        self.fps = fps
+        self.count = int(seconds * fps)
+        width, height = size
+        rng = np.random.default_rng(seed)
+        # Textured background: a vertical gradient with a few "furniture" blocks
+        background = np.tile(np.linspace(90, 150, height, dtype=np.float32)[:, None, None], (1, width, 3))
+        for _ in range(6):
+            x, y = rng.integers(0, width), rng.integers(0, height)
+            w, h = rng.integers(width // 10, width // 4), rng.integers(height // 10, height // 3)
+            background[y:y + h, x:x + w] = rng.integers(40, 220, 3)
+        self._background = background.astype(np.uint8)
+        # A few noise frames cycled through, much cheaper than fresh noise per frame
+        self._noise = [rng.integers(-6, 7, (height, width, 3)).astype(np.int16) for _ in range(4)]
+        self.events = self._schedule()
+        self.moving = np.zeros(self.count, dtype=bool)
+        self.ignore = np.zeros(self.count, dtype=bool)
+        for start, length in self.events:
+            self.moving[start:start + length] = True
+            self.ignore[start + length:start + length + TOLERANCE_FRAMES] = True
+        self.ignore[:STILL_SECONDS * fps] = True  # calibration frames are not scored
+
+    def _schedule(self):
+        if self.scenario not in ("small_moves", "large_moves"):
+            return []
+        length = int(0.6 * self.fps)
+        starts = range(STILL_SECONDS * self.fps + self.fps, self.count - length, 2 * self.fps)
+        return [(start, length) for start in starts]
+
+    def _offset(self, index):
+        """Horizontal displacement of the candidate (fraction of the frame width) and lean (scale)"""
+        for start, length in self.events:
+            if start <= index < start + length:
+                progress = np.sin(np.pi * (index - start + 1) / (length + 1))  # out and back
+                if self.scenario == "small_moves":
+                    return 0.04 * progress, 1.0
+                return 0.25 * progress, 1.0 + 0.15 * progress
+        return 0.0, 1.0
+
+    def frame(self, index):
+        width, height = self.size
+        image = self._background.copy()
+        shift, scale = self._offset(index)
+        cx, cy = int(width * (0.5 + shift)), int(height * 0.55)
+        cv2.ellipse(image, (cx, int(cy + height * 0.35 * scale)), (int(width * 0.22 * scale), int(height * 0.25 * scale)),
+                    0, 0, 360, (60, 70, 160), -1)  # shoulders
+        cv2.circle(image, (cx, int(cy - height * 0.12 * scale)), int(height * 0.16 * scale), (140, 170, 205), -1)  # head
+        if self.scenario == "drift":
+            gain = 1.0 - DRIFT_PER_SECOND * max(index - STILL_SECONDS * self.fps, 0) / self.fps
+            image = cv2.convertScaleAbs(image, alpha=gain)
+        image = np.clip(image + self._noise[index % len(self._noise)], 0, 255).astype(np.uint8)
+        return image
+
+    def __iter__(self):
+        return (self.frame(index) for index in range(self.count))
+
+
+def _percentiles(seconds):
+    values = np.asarray(seconds) * 1000
+    return {"p50_ms": float(np.percentile(values, 50)), "p95_ms": float(np.percentile(values, 95))}
+
+
+def time_stages(size, frames=60):
+    """Per-call timings of MotionDetectionModel's stages on a still clip"""
+    clip = SyntheticClip("static", size, seconds=frames / FPS + STILL_SECONDS)
+    model = MotionDetectionModel()
+    timings = {"preprocess_frame": [], "extract_features": [], "calibrate": [], "detect_movement": []}
+    # Only the calibration frames are held at once, so the harness doesn't dominate peak RSS
+    calibration = [clip.frame(index) for index in range(STILL_SECONDS * FPS)]
+    for _ in range(20):
+        started = time.perf_counter()
+        model.calibrate(calibration)
+        timings["calibrate"].append(time.perf_counter() - started)
+    out = np.empty((64, 64, 3), dtype=np.float32)
+    del calibration
+    for image in clip:
+        started = time.perf_counter()
+        processed = model.preprocess_frame(image, out=out)
+        timings["preprocess_frame"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        model.extract_features(processed)
+        timings["extract_features"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        model.detect_movement(image)
+        timings["detect_movement"].append(time.perf_counter() - started)
+    return {stage: _percentiles(values) for stage, values in timings.items()}
+
+
+def create_strategy(name):
+    if name == "static":
+        return MotionDetectionModel()
+    if name == "mean":
+        return create_backend("mean", warmup_frames=STILL_SECONDS * FPS)
+    return create_backend(name)
+
+
+def evaluate(strategy, clip):
+    """Throughput and per-frame precision / recall / F1 of one strategy on one clip"""
+    detector = create_strategy(strategy)
+    frames = iter(clip)
+    still = [next(frames) for _ in range(STILL_SECONDS * clip.fps)]
+    detector.calibrate(still)  # for "mean", this is the adaptive baseline's warm-up
+
+    detected = np.zeros(clip.count, dtype=bool)
+    durations = []
+    for index, image in enumerate(frames, start=len(still)):
+        started = time.perf_counter()
+        prediction = detector.detect_movement(image)
+        durations.append(time.perf_counter() - started)
+        detected[index] = prediction['movement_detected']
+
+    scored = ~clip.ignore
+    true_positive = int(np.count_nonzero(detected & clip.moving & scored))
+    false_positive = int(np.count_nonzero(detected & ~clip.moving & scored))
+    false_negative = int(np.count_nonzero(~detected & clip.moving & scored))
+    # With nothing to find, a detector that flags nothing is perfect
+    precision = true_positive / (true_positive + false_positive) if true_positive + false_positive else \
+        float(not clip.moving.any())
+    recall = true_positive / (true_positive + false_negative) if true_positive + false_negative else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    # Throughput from the median frame, which is far steadier between runs than the total
+    return {"fps": 1 / float(np.median(durations)), "precision": precision,
+            "recall": recall, "f1": f1, "false_positives": false_positive}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def run(resolutions, seconds, strategies, scenarios):
+    results = {"machine": {"python": platform.python_version(), "platform": platform.platform(),
+                           "cpus": os.cpu_count(), "opencv": cv2.__version__, "numpy": np.__version__},
+               "resolutions": {}}
+    for label in resolutions:
+        size = RESOLUTIONS[label]
+        section = {"stages": time_stages(size), "strategies": {}}
+        print(f"\n{label}")
+        for stage, timing in section["stages"].items():
+            print(f"  {stage:<18} p50 {timing['p50_ms']:7.3f} ms   p95 {timing['p95_ms']:7.3f} ms")
+        for scenario in scenarios:
+            clip = SyntheticClip(scenario, size, seconds=seconds)
+            for strategy in strategies:
+                outcome = evaluate(strategy, clip)
+                note = ""
+                known = KNOWN_FAILURES.get((scenario, strategy))
+                if known:
+                    outcome["known_failure"] = known
+                    note = ("   known failure, now passing: remove it from KNOWN_FAILURES"
+                            if outcome["f1"] >= KNOWN_FAILURE_F1 else f"   known failure: {known}")
+                section["strategies"].setdefault(strategy, {})[scenario] = outcome
+                print(f"  {scenario:<12} {strategy:<7} {outcome['fps']:8.0f} fps   precision {outcome['precision']:.2f}"
+                      f"   recall {outcome['recall']:.2f}   F1 {outcome['f1']:.2f}{note}")
+        section["peak_rss_mb"] = peak_rss_mb()
+        results["resolutions"][label] = section
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"\npeak RSS {results['peak_rss_mb']:.0f} MB")
+    return results
+
+
+def flatten(results):
+    """{metric name: (value, kind, higher_is_better)} for the regression gate"""
+    metrics = {"peak_rss_mb": (results["peak_rss_mb"], "memory", False)}
+    for label, section in results["resolutions"].items():
+        for stage, timing in section["stages"].items():
+            metrics[f"{label}/{stage}/p50_ms"] = (timing["p50_ms"], "time", False)
+        for strategy, by_scenario in section["strategies"].items():
+            for scenario, outcome in by_scenario.items():
+                metrics[f"{label}/{strategy}/{scenario}/fps"] = (outcome["fps"], "time", True)
+                metrics[f"{label}/{strategy}/{scenario}/f1"] = (outcome["f1"], "quality", True)
+    return metrics
+
+
+def regressions(current, baseline, tolerances=TOLERANCES):
+    """Human-readable lines for every metric worse than the baseline by more than its tolerance"""
+    found = []
+    base_metrics = flatten(baseline)
+    for name, (value, kind, higher_is_better) in flatten(current).items():
+        if name not in base_metrics:
+            continue
+        base = base_metrics[name][0]
+        allowed = tolerances[kind]
+        if kind == "quality":
+            # F1 is already a 0-1 score, so its tolerance is absolute
+            worse = value < base - allowed
+        elif higher_is_better:
+            worse = value < base / (1 + allowed)
+        else:
+            worse = value > base * (1 + allowed)
+        if worse:
+            found.append(f"{name}: {value:.3f} vs baseline {base:.3f}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion detection benchmarks on synthetic video")
+    parser.add_argument("--quick", action="store_true", help="320x240 only, 8-second clips")
+    parser.add_argument("--resolutions", nargs="+", choices=sorted(RESOLUTIONS), help="override the resolutions")
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=list(STRATEGIES))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seconds", type=float, help="clip length (default 12, 8 with --quick)")
+    parser.add_argument("--output", help="write the full results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail (exit 1) on regressions against the baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TOLERANCES["time"],
+                        help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--quality-tolerance", type=float, default=TOLERANCES["quality"], help="allowed F1 drop")
+    args = parser.parse_args()
+
+    resolutions = args.resolutions or (["320x240"] if args.quick else list(RESOLUTIONS))
+    seconds = args.seconds or (8 if args.quick else 12)
+    # One thread, so timings compare across machines with different core counts
+    cv2.setNumThreads(1)
+    results = run(resolutions, seconds, args.strategies, args.scenarios)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            raise SystemExit(f"no baseline at {args.baseline}; run with --save-baseline first")
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        tolerances = dict(TOLERANCES, time=args.time_tolerance, quality=args.quality_tolerance)
+        found = regressions(results, baseline, tolerances)
+        if found:
+            print(f"\n{len(found)} regressions against {args.baseline}:")
+            for line in found:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+import numpy as np
+import cv2
+
+# TensorFlow is only imported when the CNN is first used (see MotionDetectionModel.model), so the
+# channel-mean detector and the other backends start in well under a second without it.
+# motion_runtime.py exports the CNN to TFLite / ONNX for workers that should never load TensorFlow.
+
+FRAME_SIZE = (64, 64)
+# Smallest per-channel spread the features are scaled by (channel means are in [0, 1]). A still
+# calibration clip varies by sensor noise only, ~1e-4, and dividing by that flags every later frame
+# as movement. Same floor as MotionMonitor's min_std.
+MIN_FEATURE_STD = 0.02
+
+
+def resize_batch(frames, size=FRAME_SIZE):
+    """cv2.resize of every frame in an (N, H, W, C) batch, keeping the input dtype"""
+    n, height, width = frames.shape[:3]
+    if height >= size[1] and width >= size[0]:
+        # When downscaling, bilinear source pixels never cross a frame edge, so the batch can be
+        # resized as one tall image in a single call with results identical to per-frame resizes
+        tall = np.ascontiguousarray(frames).reshape(n * height, width, -1)
+        return cv2.resize(tall, (size[0], n * size[1])).reshape(n, size[1], size[0], -1)
+    resized = np.empty((n, size[1], size[0], frames.shape[3]), dtype=frames.dtype)
+    for i, frame in enumerate(frames):
+        resized[i] = cv2.resize(frame, size).reshape(resized.shape[1:])
+    return resized
+
+
+def _as_batch(frames):
+    frames = np.asarray(frames)
+    if frames.ndim != 4:
+        raise ValueError(f"expected an (N, H, W, 3) batch, got shape {frames.shape}")
+    return frames
+
+
+def build_cnn():
+    """The Keras classifier (class 0 = moving, 1 = still); imports TensorFlow"""
+    from tensorflow import keras
+
+    # Dummy model architecture
+    return keras.Sequential([
+        keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(64, 64, 3)),
+        keras.layers.MaxPooling2D((2, 2)),
+        keras.layers.Conv2D(64, (3, 3), activation='relu'),
+        keras.layers.MaxPooling2D((2, 2)),
+        keras.layers.Flatten(),
+        keras.layers.Dense(64, activation='relu'),
+        keras.layers.Dense(2, activation='softmax')  # 2 classes: moving vs still
+    ])
+
+
+def describe_movement(prediction):
+    """Verdict text for a prediction: every flagged frame is at least minor movement"""
+    if prediction['movement_detected']:
+        if prediction['confidence'] > 0.95:
+            return "Significant movement detected - please stay still"
+        return "Minor movement detected - try to maintain position"
+    return "Position OK"
+
+
+class FeatureScaler:
+    """
+    sklearn's StandardScaler for the three channel means, in NumPy: same fit/transform and
+    mean_/scale_, without importing sklearn at startup. Scales are floored at `min_scale`; with the
+    default of 0, constant features keep a scale of 1 as in sklearn.
+    """
+
+    def __init__(self, min_scale=0.0):
+        self.min_scale = min_scale
+        self.mean_ = None
+        self.scale_ = None
+
+    def fit(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        self.mean_ = features.mean(axis=0)
+        scale = features.std(axis=0)
+        if self.min_scale > 0:
+            scale = np.maximum(scale, self.min_scale)
+        else:
+            scale[scale < 10 * np.finfo(np.float64).eps] = 1.0
+        self.scale_ = scale
+        return self
+
+    def transform(self, features):
+        if self.mean_ is None:
+            raise RuntimeError("FeatureScaler is not fitted yet; call calibrate() first")
+        return (np.asarray(features, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class MotionDetectionModel:
+    def __init__(self):
+        self._model = None  # Keras CNN, built on first use of .model
+        self._resized = None  # reused by the single-frame path, so steady-state frames don't allocate
+        self.scaler = FeatureScaler(min_scale=MIN_FEATURE_STD)
+        self.baseline_features = None
+        self.movement_threshold = 0.85
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = build_cnn()
+        return self._model
+
+    def _resize(self, frame):
+        """`frame` at FRAME_SIZE, resized into a buffer that is overwritten by the next call"""
+        if frame.shape[1::-1] == FRAME_SIZE:
+            return frame
+        shape = FRAME_SIZE[::-1] + frame.shape[2:]
+        if self._resized is None or self._resized.shape != shape or self._resized.dtype != frame.dtype:
+            self._resized = np.empty(shape, dtype=frame.dtype)
+        return cv2.resize(frame, FRAME_SIZE, dst=self._resized)
+
+    def preprocess_frame(self, frame, out=None):
+        """Resize and normalize frame to float32 in [0, 1]; pass a (64, 64, 3) float32 `out` to reuse it"""
+        resized = self._resize(frame)
+        if out is None:
+            out = np.empty(resized.shape, dtype=np.float32)
+        return np.multiply(resized, np.float32(1 / 255.0), out=out)
+
+    def extract_features(self, frame):
+        # Extract "motion features" from frame
+        features = np.mean(frame, axis=(0, 1))
+        features = self.scaler.transform(features.reshape(1, -1))
+        return features[0]
+
+    def preprocess_batch(self, frames):
+        """(N, H, W, 3) frames -> (N, 64, 64, 3) float32 in [0, 1]"""
+        return resize_batch(_as_batch(frames)).astype(np.float32) * np.float32(1 / 255.0)
+
+    def extract_features_batch(self, processed):
+        """Scaled per-channel means, one row per frame"""
+        return self.scaler.transform(processed.mean(axis=(1, 2)))
+
+    def channel_means_batch(self, frames):
+        """Unscaled features: preprocess_batch(...).mean(axis=(1, 2)) without materialising the float frames"""
+        resized = resize_batch(_as_batch(frames))
+        pixels = resized.reshape(len(resized), -1, resized.shape[-1]).astype(np.float32)
+        # A matmul with a ones vector is much faster than .mean() over two axes, and exact here:
+        # 64*64 sums of 0..255 stay well inside float32's integer range
+        return np.ones(pixels.shape[1], dtype=np.float32) @ pixels / np.float64(pixels.shape[1] * 255)
+
+    def channel_means(self, frame, out=None):
+        """channel_means_batch() of a single frame, without allocating frame-sized buffers"""
+        resized = self._resize(frame)
+        channels = resized.shape[2] if resized.ndim == 3 else 1
+        if out is None:
+            out = np.empty(channels)
+        # cv2.sumElems adds in double precision, so this matches the batch path exactly
+        out[:] = cv2.sumElems(resized)[:channels]
+        out /= np.float64(resized.shape[0] * resized.shape[1] * 255)
+        return out
+
+    def calibrate(self, initial_frames):
+        """Store baseline position from calibration frames"""
+        self.calibrate_batch(initial_frames)
+
+    def calibrate_batch(self, frames):
+        """Fit the feature scaler on an (N, H, W, 3) calibration batch and store the baseline"""
+        raw_features = self.channel_means_batch(frames)
+        self.scaler.fit(raw_features)
+        self.baseline_features = self.scaler.transform(raw_features).mean(axis=0)
+
+    def detect_movement_batch(self, frames):
+        """
+        Score an (N, H, W, 3) batch in one pass against the calibration baseline.
+        Returns columns rather than per-frame dicts:
+            - movement_detected (N,) bool
+            - confidence (N,) float
+            - position_change: {'x': (N,), 'y': (N,)}
+        """
+        return self._score(self.channel_means_batch(frames))
+
+    def _score(self, raw_features):
+        features = self.scaler.transform(raw_features)
+        delta = features - self.baseline_features
+        movement_score = np.clip(np.abs(delta).mean(axis=1) * 2, 0, 1)  # Scale difference to 0-1
+        return {
+            'movement_detected': movement_score > self.movement_threshold,
+            'confidence': movement_score,
+            'position_change': {'x': delta[:, 0], 'y': delta[:, 1]},
+        }
+
+    def detect_movement(self, current_frame):
+        """
+        Detect if there's significant movement in current frame
+        Returns:
+            - movement_detected (bool): True if significant movement detected
+            - confidence (float): Confidence score of the prediction
+        """
+        # Scored as a batch of one, so single frames and batches give identical results
+        batch = self._score(self.channel_means(np.asarray(current_frame))[None])
+
+        # Dummy prediction format matching real ML model output
+        prediction = {
+            'movement_detected': bool(batch['movement_detected'][0]),
+            'confidence': float(batch['confidence'][0]),
+            'position_change': {
+                'x': float(batch['position_change']['x'][0]),
+                'y': float(batch['position_change']['y'][0])
+            }
+        }
+        
+        return prediction
+
+    def get_movement_analysis(self, frame):
+        """Detailed movement analysis"""
+        return describe_movement(self.detect_movement(frame))
+
+# Usage: calibrate on ~3 seconds of frames, then score frames as they arrive.
+# motion_pipeline.py runs this against a webcam or video file with threaded capture:
+#
+#     python motion_pipeline.py --source 0 --fps 15
@@ -0,0 +1,302 @@
+"""
+Streaming motion detection: capture -> preprocess -> detect, each stage on its own thread.
+
+Stages are joined by small bounded queues. When a stage falls behind, the oldest queued frame
+is dropped for the newest one (latest frame wins), so detection latency stays bounded instead of
+growing with a backlog. Capture is paced to a target FPS.
+
+    python motion_pipeline.py --source 0 --fps 15
+    python motion_pipeline.py --source clip.mp4 --fps 0 --stats-every 2
+    python motion_pipeline.py --source 0 --baseline static --calibration-seconds 3
+    python motion_pipeline.py --source 0 --backend diff
+    python motion_pipeline.py --source 0 --backend cnn --runtime motion_cnn.tflite
+"""
+import argparse
+import queue
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from motion_backends import BACKENDS, create_backend
+from motion_detection import FRAME_SIZE, MotionDetectionModel
+
+STAGES = ("capture", "preprocess", "detect", "latency")
+
+
+class Frame(NamedTuple):
+    index: int
+    captured: float  # time.perf_counter() when the frame was read
+    image: np.ndarray
+
+
+class StageTimer:
+    """Rolling timings of one stage (or end-to-end latency)"""
+
+    def __init__(self, window=300):
+        self._durations = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._durations.append(seconds)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            values = sorted(self._durations)
+            count = self.count
+        if not values:
+            return {"count": count, "p50_ms": None, "p95_ms": None, "max_ms": None}
+        pick = lambda fraction: values[min(len(values) - 1, int(fraction * len(values)))] * 1000
+        return {"count": count, "p50_ms": pick(0.50), "p95_ms": pick(0.95), "max_ms": values[-1] * 1000}
+
+
+def put_latest(q, item):
+    """Enqueue without blocking, dropping the oldest entry when full; returns True if one was dropped"""
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+class MotionPipeline:
+    """
+    `read_frame()` returns the next (H, W, 3) frame, or None at the end of the stream.
+    `on_result(frame, prediction)` is called on the detect thread for every scored frame.
+    """
+
+    def __init__(self, model, read_frame, target_fps=15.0, queue_size=1, on_result=None):
+        self.model = model
+        self.read_frame = read_frame
+        self.target_fps = target_fps
+        self.on_result = on_result
+        self.timers = {stage: StageTimer() for stage in STAGES}
+        self.dropped = {"preprocess": 0, "detect": 0}
+        self.latest = None  # (Frame, prediction) of the most recent detection
+        self._to_preprocess = queue.Queue(queue_size)
+        self._to_detect = queue.Queue(queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for name, target in (("capture", self._capture_loop), ("preprocess", self._preprocess_loop),
+                             ("detect", self._detect_loop)):
+            thread = threading.Thread(target=target, name=f"motion-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for the pipeline to drain (end of stream) or stop, up to `timeout` seconds in total"""
+        deadline = time.perf_counter() + timeout if timeout is not None else None
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(deadline - time.perf_counter(), 0))
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def _get(self, q):
+        # Polls so a stop() is noticed even when upstream has gone quiet
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _finish(self, q):
+        # End-of-stream marker; unlike frames it must not be dropped
+        while not self._stop.is_set():
+            try:
+                q.put(None, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _capture_loop(self):
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+        next_at = time.perf_counter()
+        index = 0
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            image = self.read_frame()
+            if image is None:
+                break
+            self.timers["capture"].record(time.perf_counter() - started)
+            if put_latest(self._to_preprocess, Frame(index, started, image)):
+                self.dropped["preprocess"] += 1
+            index += 1
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    # Behind schedule: carry on from now rather than bursting to catch up
+                    next_at = time.perf_counter()
+        self._finish(self._to_preprocess)
+
+    def _preprocess_loop(self):
+        while True:
+            frame = self._get(self._to_preprocess)
+            if frame is None:
+                break
+            started = time.perf_counter()
+            image = fit_frame(self.model, frame.image)
+            self.timers["preprocess"].record(time.perf_counter() - started)
+            if put_latest(self._to_detect, frame._replace(image=image)):
+                self.dropped["detect"] += 1
+        self._finish(self._to_detect)
+
+    def _detect_loop(self):
+        while True:
+            frame = self._get(self._to_detect)
+            if frame is None:
+                break
+            started = time.perf_counter()
+            prediction = self.model.detect_movement(frame.image)
+            finished = time.perf_counter()
+            self.timers["detect"].record(finished - started)
+            self.timers["latency"].record(finished - frame.captured)
+            self.latest = (frame, prediction)
+            if self.on_result is not None:
+                self.on_result(frame, prediction)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        detected = self.timers["detect"].count
+        return {
+            "elapsed_seconds": elapsed,
+            "captured": self.timers["capture"].count,
+            "detected": detected,
+            "detect_fps": detected / elapsed if elapsed else 0.0,
+            "dropped": dict(self.dropped),
+            "stages": {stage: timer.summary() for stage, timer in self.timers.items()},
+        }
+
+
+def format_stats(stats):
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    stages = " · ".join(
+        f"{stage} p50 {ms(summary['p50_ms'])} / p95 {ms(summary['p95_ms'])} ms"
+        for stage, summary in stats["stages"].items()
+    )
+    return (f"{stats['detected']}/{stats['captured']} frames scored ({stats['detect_fps']:.1f} fps), "
+            f"dropped {stats['dropped']['preprocess']}+{stats['dropped']['detect']} · {stages}")
+
+
+def open_source(source):
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise SystemExit(f"could not open video source {source!r}")
+
+    def read_frame():
+        ok, frame = capture.read()
+        return frame if ok else None
+
+    return capture, read_frame
+
+
+def fit_frame(model, image):
+    """`image` at the size `model` works at, resized the same way for calibration and scoring"""
+    # Backends declare the frame size they work at; the channel-mean model uses FRAME_SIZE
+    size = getattr(model, "input_size", FRAME_SIZE)
+    if image.shape[1::-1] != tuple(size):
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def calibrate(model, read_frame, seconds, fps):
+    """Score baseline from `seconds` of frames (at most `fps` per second when fps is set)"""
+    frames = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frame = read_frame()
+        if frame is None:
+            break
+        frames.append(fit_frame(model, frame))
+        if fps:
+            time.sleep(1.0 / fps)
+    if not frames:
+        raise SystemExit("no frames available for calibration")
+    model.calibrate_batch(np.stack(frames))
+    return len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Real-time motion detection on a webcam or video file")
+    parser.add_argument("--source", default="0", help="camera index or video file/URL")
+    parser.add_argument("--fps", type=float, default=15.0, help="target capture rate (0 = as fast as possible)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mean",
+                        help="detection engine (see motion_backends.py)")
+    parser.add_argument("--weights", help="trained Keras weights for --backend cnn")
+    parser.add_argument("--runtime", help="TFLite/ONNX export for --backend cnn (see motion_runtime.py)")
+    parser.add_argument("--baseline", choices=["ewma", "ring", "static"], default="ewma",
+                        help="for --backend mean: adaptive baseline (see motion_baseline.py) or one-off calibration")
+    parser.add_argument("--alpha", type=float, default=0.02, help="EWMA baseline weight of each new frame")
+    parser.add_argument("--window", type=int, default=300, help="frames in the ring baseline")
+    parser.add_argument("--warmup-frames", type=int, default=45, help="frames that build an adaptive baseline")
+    parser.add_argument("--calibration-seconds", type=float, default=3.0, help="calibration for --baseline static")
+    parser.add_argument("--queue-size", type=int, default=1, help="frames buffered between stages")
+    parser.add_argument("--stats-every", type=float, default=5.0, help="seconds between timing reports")
+    args = parser.parse_args()
+    if args.backend == "cnn" and not (args.weights or args.runtime):
+        parser.error("--backend cnn needs --weights or --runtime")
+
+    capture, read_frame = open_source(args.source)
+    if args.backend == "mean" and args.baseline == "static":
+        detector = MotionDetectionModel()
+        print(f"Calibrating on {calibrate(detector, read_frame, args.calibration_seconds, args.fps)} frames...")
+    elif args.backend == "mean":
+        # The monitor warms up on the stream itself and keeps adapting to lighting drift
+        detector = create_backend("mean", baseline=args.baseline, alpha=args.alpha, window=args.window,
+                                  warmup_frames=args.warmup_frames)
+    elif args.backend == "cnn":
+        detector = create_backend("cnn", weights=args.weights, runtime=args.runtime)
+    else:
+        detector = create_backend(args.backend)
+
+    last_warning = [0.0]
+
+    def on_result(frame, prediction):
+        # At most one warning a second, however many frames flag movement
+        if prediction['movement_detected'] and frame.captured - last_warning[0] > 1.0:
+            last_warning[0] = frame.captured
+            print(f"Please maintain your position (confidence {prediction['confidence']:.2f})")
+
+    pipeline = MotionPipeline(detector, read_frame, target_fps=args.fps, queue_size=args.queue_size,
+                              on_result=on_result).start()
+    try:
+        while pipeline.is_running():
+            pipeline.join(args.stats_every)
+            if pipeline.is_running():
+                print(format_stats(pipeline.stats()))
+    except KeyboardInterrupt:
+        pipeline.stop()
+    finally:
+        capture.release()
+    print(format_stats(pipeline.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Run the motion CNN through a small CPU runtime instead of TensorFlow.
+
+Export the trained Keras classifier once (this step needs TensorFlow), then workers load the
+exported file with TFLite (`tflite-runtime`, ~5 MB) or ONNX Runtime and never import TensorFlow:
+
+    python motion_runtime.py export --weights cnn.weights.h5 --out motion_cnn.tflite
+    python motion_runtime.py export --weights cnn.weights.h5 --out motion_cnn.tflite --int8 --calibration clip.mp4
+    python motion_runtime.py export --weights cnn.weights.h5 --out motion_cnn.onnx [--int8]
+    python motion_runtime.py bench motion_cnn.tflite
+
+    python motion_pipeline.py --source 0 --backend cnn --runtime motion_cnn.tflite
+
+`--int8` quantizes the weights (and, for TFLite with calibration frames, the activations too),
+which makes the model about 4x smaller and usually faster on CPU. The exported model takes the
+same (N, 64, 64, 3) float32 input in [0, 1] and returns the same softmax (class 0 = moving).
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+FORMATS = {".tflite": "tflite", ".onnx": "onnx"}
+
+
+def _format_of(path):
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"unknown model format for {path!r}, expected one of {sorted(FORMATS)}")
+    return fmt
+
+
+def export_tflite(keras_model, path, int8=False, calibration=None):
+    """
+    Write `keras_model` as a TFLite flatbuffer. With `int8`, weights are quantized; if `calibration`
+    (an (N, 64, 64, 3) float32 batch in [0, 1]) is given, activations are too (full integer model
+    with float input/output, so callers don't change).
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if calibration is not None:
+            converter.representative_dataset = lambda: ([frame[None]] for frame in calibration)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+    return path
+
+
+def export_onnx(keras_model, path, int8=False):
+    """Write `keras_model` as ONNX (needs tf2onnx); `int8` applies ONNX Runtime's dynamic quantization"""
+    import tensorflow as tf
+    import tf2onnx
+
+    spec = (tf.TensorSpec((None, 64, 64, 3), tf.float32, name="frames"),)
+    target = path + ".fp32" if int8 else path
+    tf2onnx.convert.from_keras(keras_model, input_signature=spec, output_path=target)
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(target, path, weight_type=QuantType.QInt8)
+        os.remove(target)
+    return path
+
+
+def export(keras_model, path, int8=False, calibration=None):
+    if _format_of(path) == "tflite":
+        return export_tflite(keras_model, path, int8=int8, calibration=calibration)
+    return export_onnx(keras_model, path, int8=int8)
+
+
+class TFLiteClassifier:
+    def __init__(self, path, num_threads=1):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:  # fall back to the interpreter bundled with full TensorFlow
+            from tensorflow.lite import Interpreter
+
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch = None
+        self._interpreter.allocate_tensors()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        if batch.shape[0] != self._batch:
+            # The interpreter plans its buffers for one batch size; only re-plan when it changes
+            self._interpreter.resize_tensor_input(self._input["index"], batch.shape)
+            self._interpreter.allocate_tensors()
+            self._batch = batch.shape[0]
+        self._interpreter.set_tensor(self._input["index"], batch)
+        self._interpreter.invoke()
+        return self._interpreter.get_tensor(self._output["index"])
+
+
+class ONNXClassifier:
+    def __init__(self, path, num_threads=1):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self._input = self._session.get_inputs()[0].name
+
+    def predict(self, batch):
+        return self._session.run(None, {self._input: np.asarray(batch, dtype=np.float32)})[0]
+
+
+def load_classifier(path, num_threads=1):
+    """A TFLite or ONNX classifier with .predict((N, 64, 64, 3) float32) -> (N, 2) probabilities"""
+    classes = {"tflite": TFLiteClassifier, "onnx": ONNXClassifier}
+    return classes[_format_of(path)](path, num_threads=num_threads)
+
+
+def _calibration_frames(source, count=200):
+    import cv2
+
+    from motion_detection import MotionDetectionModel
+    from motion_pipeline import fit_frame
+
+    model = MotionDetectionModel()
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    frames = []
+    while len(frames) < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(fit_frame(model, frame))
+    capture.release()
+    if not frames:
+        raise SystemExit(f"no calibration frames read from {source!r}")
+    return model.preprocess_batch(np.stack(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the motion CNN to a CPU runtime, or benchmark an export")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_args = commands.add_parser("export", help="convert the Keras CNN (needs TensorFlow)")
+    export_args.add_argument("--weights", help="trained Keras weights (omit to export the untrained model)")
+    export_args.add_argument("--out", required=True, help="output path ending in .tflite or .onnx")
+    export_args.add_argument("--int8", action="store_true", help="quantize to int8")
+    export_args.add_argument("--calibration", help="video for full-integer TFLite quantization")
+    bench_args = commands.add_parser("bench", help="time loading and inference of an exported model")
+    bench_args.add_argument("path")
+    bench_args.add_argument("--batch", type=int, default=1)
+    bench_args.add_argument("--runs", type=int, default=200)
+    bench_args.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from motion_detection import build_cnn
+
+        model = build_cnn()
+        if args.weights:
+            model.load_weights(args.weights)
+        calibration = _calibration_frames(args.calibration) if args.calibration else None
+        path = export(model, args.out, int8=args.int8, calibration=calibration)
+        print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KiB)")
+        return
+
+    started = time.perf_counter()
+    classifier = load_classifier(args.path, num_threads=args.threads)
+    loaded = time.perf_counter() - started
+    batch = np.random.default_rng(0).random((args.batch, 64, 64, 3), dtype=np.float32)
+    classifier.predict(batch)  # warm-up
+    started = time.perf_counter()
+    for _ in range(args.runs):
+        classifier.predict(batch)
+    per_batch = (time.perf_counter() - started) / args.runs
+    print(f"load {loaded * 1000:.0f} ms · {per_batch * 1000:.2f} ms per batch of {args.batch} "
+          f"({args.batch / per_batch:.0f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Motion inference for many interview sessions at once.
+
+Frames from every session go through one service instead of a MotionDetectionModel per session.
+Sessions are sharded over a pool of worker processes by a stable hash of their id, so all cores
+are used and each session's adaptive baseline (motion_baseline.MotionMonitor) lives in exactly
+one worker. Every shard micro-batches the frames that arrive across its sessions: a batch is sent
+when `max_batch` frames are waiting or the oldest has waited `max_delay` seconds. The worker reduces
+the batch to channel-mean features in one pass over its frames, then scores each frame against its
+own session's baseline in arrival order.
+
+    service = MotionService(workers=8).start()
+    future = service.submit("candidate-42", frame)   # concurrent.futures.Future
+    prediction = future.result()                      # same dict as MotionDetectionModel
+    service.close_session("candidate-42")
+
+When a shard falls behind by more than `max_queue` frames, its oldest waiting frame is dropped and
+its future cancelled (latest frame wins, as in MotionPipeline). start() returns once every worker
+has loaded and reported ready. If a worker dies, the frames it was scoring, the frames waiting for
+it and any later frames of its sessions fail with RuntimeError instead of waiting forever.
+
+With `frame_shape` set (e.g. (480, 640, 3)), frames of that shape reach the workers through a
+shared-memory FrameRing per shard instead of being pickled; only slot indices go down the pipe.
+The ring then also bounds the queue: when every slot is taken, the oldest waiting frame is
+dropped to free one. Frames of other shapes are still sent pickled.
+
+Simulated load:
+
+    python motion_service.py --sessions 300 --fps 15 --seconds 20
+"""
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from frame_ring import FrameRing
+from motion_pipeline import StageTimer
+
+CLOSE = object()  # pending-queue marker: drop the session's baseline once earlier frames are scored
+
+
+def shard_of(session_id, shards):
+    """Stable across processes and restarts, unlike hash()"""
+    return zlib.crc32(str(session_id).encode()) % shards
+
+
+def _worker_main(conn, monitor_options, ring_spec):
+    from motion_backends import create_backend
+    from motion_detection import MotionDetectionModel
+
+    model = MotionDetectionModel()
+    ring = FrameRing.attach(ring_spec) if ring_spec else None
+    monitors = {}
+    features = np.empty((0, 3))
+    conn.send("ready")
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        session_ids, frames = message
+        if len(frames) > len(features):
+            features = np.empty((len(frames), 3))
+        # Each frame is reduced to channel means in place (ring slots are read where they are),
+        # which is cheaper than stacking the batch into one array first
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                model.channel_means(ring.get(frame) if isinstance(frame, int) else frame, out=features[i])
+
+        predictions = []
+        for session_id, frame, row in zip(session_ids, frames, features):
+            if frame is None:
+                monitors.pop(session_id, None)
+                predictions.append(None)
+                continue
+            monitor = monitors.get(session_id)
+            if monitor is None:
+                monitor = monitors[session_id] = create_backend("mean", **monitor_options)
+            predictions.append(monitor.score(row))
+        conn.send((predictions, len(monitors)))
+    if ring is not None:
+        ring.close()
+
+
+class _Shard:
+    def __init__(self, index, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.pending = deque()  # (future or None, session_id, frame / ring slot / CLOSE, submitted)
+        self.ring = None
+        self.ready = threading.Condition()
+        self.in_flight = 0
+        self.sessions = 0
+        self.thread = None
+        self.error = None  # set once the worker has died; fails every later frame
+
+
+class MotionService:
+    def __init__(self, workers=None, max_batch=32, max_delay=0.010, max_queue=256, frame_shape=None,
+                 ring_slots=None, baseline="ewma", alpha=0.02, window=300, warmup_frames=45):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max_queue
+        self.frame_shape = tuple(frame_shape) if frame_shape else None
+        self.ring_slots = ring_slots or 2 * max_batch
+        self.monitor_options = {"baseline": baseline, "alpha": alpha, "window": window,
+                                "warmup_frames": warmup_frames}
+        self.latency = StageTimer(window=2000)
+        self.batch_sizes = deque(maxlen=500)
+        self.counts = {"submitted": 0, "scored": 0, "dropped": 0, "batches": 0, "pickled": 0}
+        self._lock = threading.Lock()
+        self._shards = []
+        self._stop = threading.Event()
+        self._started = None
+
+    def start(self, timeout=60.0):
+        """Start the workers and wait until each has loaded; raises RuntimeError if one does not come up"""
+        # spawn, not fork: the parent has threads running, and workers only need numpy and cv2
+        context = multiprocessing.get_context("spawn")
+        for index in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            ring = FrameRing(self.ring_slots, self.frame_shape) if self.frame_shape else None
+            process = context.Process(target=_worker_main,
+                                      args=(child_conn, self.monitor_options, ring.spec if ring else None),
+                                      name=f"motion-worker-{index}", daemon=True)
+            process.start()
+            child_conn.close()
+            shard = _Shard(index, process, parent_conn)
+            shard.ring = ring
+            shard.thread = threading.Thread(target=self._batch_loop, args=(shard,),
+                                            name=f"motion-batcher-{index}", daemon=True)
+            self._shards.append(shard)
+        # Workers import and attach in parallel; frames submitted before they are up would only queue and drop
+        deadline = time.perf_counter() + timeout
+        for shard in self._shards:
+            try:
+                if not shard.conn.poll(max(deadline - time.perf_counter(), 0)):
+                    raise TimeoutError(f"no ready message within {timeout:g}s")
+                shard.conn.recv()
+            except (EOFError, OSError) as error:
+                self.stop(timeout=1.0)
+                raise RuntimeError(f"motion worker {shard.index} failed to start: {error!r}") from error
+        for shard in self._shards:
+            shard.thread.start()
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for shard in self._shards:
+            with shard.ready:
+                shard.ready.notify()
+        deadline = time.perf_counter() + timeout
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                shard.thread.join(max(deadline - time.perf_counter(), 0))
+            for future, *_ in shard.pending:
+                if future is not None:
+                    future.cancel()
+            try:
+                shard.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            shard.process.join(max(deadline - time.perf_counter(), 0))
+            if shard.process.is_alive():
+                shard.process.terminate()
+            if shard.ring is not None:
+                shard.ring.close()
+
+    def submit(self, session_id, frame):
+        """Queue an (H, W, 3) frame of `session_id`; the future resolves to its prediction dict"""
+        future = Future()
+        shard = self._shards[shard_of(session_id, len(self._shards))]
+        submitted = time.perf_counter()
+        slot = None
+        dropped = []
+        with shard.ready:
+            if shard.error is not None:
+                future.set_exception(shard.error)
+                return future
+            if shard.ring is not None and frame.shape == shard.ring.shape:
+                slot = shard.ring.put(frame)
+                # A full ring drops the oldest waiting frame, like a full queue
+                while slot is None and self._drop_oldest(shard, dropped):
+                    slot = shard.ring.put(frame)
+            shard.pending.append((future, session_id, frame if slot is None else slot, submitted))
+            if len(shard.pending) > self.max_queue:
+                self._drop_oldest(shard, dropped)
+            shard.ready.notify()
+        with self._lock:
+            self.counts["submitted"] += 1
+            self.counts["pickled"] += slot is None
+            self.counts["dropped"] += len(dropped)
+        for stale in dropped:
+            stale.cancel()
+        return future
+
+    def detect_movement(self, session_id, frame, timeout=None):
+        return self.submit(session_id, frame).result(timeout)
+
+    def close_session(self, session_id):
+        """Forget the session's baseline after its already-submitted frames are scored"""
+        shard = self._shards[shard_of(session_id, len(self._shards))]
+        with shard.ready:
+            if shard.error is not None:
+                return
+            shard.pending.append((None, session_id, CLOSE, time.perf_counter()))
+            shard.ready.notify()
+
+    @staticmethod
+    def _release(shard, items):
+        for _, _, frame, _ in items:
+            if isinstance(frame, int):
+                shard.ring.release(frame)
+
+    def _drop_oldest(self, shard, dropped):
+        """Remove the oldest waiting frame, adding its future to `dropped`; False if there was none"""
+        for position, item in enumerate(shard.pending):
+            if item[0] is not None:  # close markers are never dropped
+                del shard.pending[position]
+                self._release(shard, [item])
+                dropped.append(item[0])
+                return True
+        return False
+
+    def _next_batch(self, shard):
+        with shard.ready:
+            while not shard.pending and not self._stop.is_set():
+                shard.ready.wait(0.1)
+            # Wait for a full batch, but never hold the oldest frame past the deadline
+            while len(shard.pending) < self.max_batch and not self._stop.is_set():
+                remaining = shard.pending[0][3] + self.max_delay - time.perf_counter()
+                if remaining <= 0:
+                    break
+                shard.ready.wait(remaining)
+            if self._stop.is_set():
+                return None
+            batch = [shard.pending.popleft() for _ in range(min(self.max_batch, len(shard.pending)))]
+            shard.in_flight = len(batch)
+        return batch
+
+    def _batch_loop(self, shard):
+        while True:
+            batch = self._next_batch(shard)
+            if batch is None:
+                return
+            # Futures cancelled by their caller since submit() are skipped
+            live, cancelled = [], []
+            for item in batch:
+                (live if item[0] is None or item[0].set_running_or_notify_cancel() else cancelled).append(item)
+            self._release(shard, cancelled)
+            batch = live
+            try:
+                shard.conn.send(([session_id for _, session_id, _, _ in batch],
+                                 [None if frame is CLOSE else frame for _, _, frame, _ in batch]))
+                predictions, shard.sessions = shard.conn.recv()
+            except (EOFError, OSError) as error:
+                self._fail(shard, batch, RuntimeError(f"motion worker {shard.index} died: {error!r}"))
+                return
+            finished = time.perf_counter()
+            self._release(shard, batch)
+            scored = 0
+            for (future, _, _, submitted), prediction in zip(batch, predictions):
+                if future is not None:
+                    future.set_result(prediction)
+                    self.latency.record(finished - submitted)
+                    scored += 1
+            shard.in_flight = 0
+            with self._lock:
+                self.counts["scored"] += scored
+                self.counts["batches"] += 1
+                self.batch_sizes.append(scored)
+
+    def _fail(self, shard, batch, error):
+        """Fail `batch`, everything still waiting on the shard and every later submit to it"""
+        with shard.ready:
+            shard.error = error
+            waiting = list(shard.pending)
+            shard.pending.clear()
+            shard.in_flight = 0
+        self._release(shard, batch)
+        for future, *_ in batch:
+            if future is not None:
+                future.set_exception(error)
+        # Waiting frames were never marked running, so their callers may have cancelled them meanwhile
+        self._release(shard, waiting)
+        for future, *_ in waiting:
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        with self._lock:
+            counts = dict(self.counts)
+            sizes = list(self.batch_sizes)
+        return {
+            "elapsed_seconds": elapsed,
+            **counts,
+            "throughput_fps": counts["scored"] / elapsed if elapsed else 0.0,
+            "sessions": sum(shard.sessions for shard in self._shards),
+            "queue_depth": [len(shard.pending) + shard.in_flight for shard in self._shards],
+            "ring_slots_in_use": [shard.ring.in_use() for shard in self._shards if shard.ring is not None],
+            "mean_batch": sum(sizes) / len(sizes) if sizes else 0.0,
+            "latency": self.latency.summary(),
+        }
+
+
+def format_stats(stats):
+    latency = stats["latency"]
+    ms = lambda value: f"{value:.1f}" if value is not None else "-"
+    return (f"{stats['scored']}/{stats['submitted']} frames scored ({stats['throughput_fps']:.0f} fps), "
+            f"dropped {stats['dropped']}, pickled {stats['pickled']} · {stats['sessions']} sessions · mean batch {stats['mean_batch']:.1f} · "
+            f"queue depth max {max(stats['queue_depth'], default=0)} · "
+            f"latency p50 {ms(latency['p50_ms'])} / p95 {ms(latency['p95_ms'])} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many concurrent sessions against the motion service")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--fps", type=float, default=15.0, help="frames per second per session")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--frame-size", default="320x240", help="WIDTHxHEIGHT of the simulated frames")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-delay-ms", type=float, default=10.0)
+    parser.add_argument("--max-queue", type=int, default=256, help="frames waiting per worker before dropping")
+    parser.add_argument("--pickle", action="store_true", help="send frames pickled instead of through shared memory")
+    parser.add_argument("--stats-every", type=float, default=2.0)
+    args = parser.parse_args()
+
+    width, height = (int(part) for part in args.frame_size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    # A handful of noisy still scenes, shared by the simulated sessions
+    scenes = [np.clip(rng.normal(110 + 10 * i, 4, (height, width, 3)), 0, 255).astype(np.uint8) for i in range(8)]
+
+    service = MotionService(workers=args.workers, max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000,
+                            max_queue=args.max_queue,
+                            frame_shape=None if args.pickle else (height, width, 3)).start()
+    print(f"{service.workers} workers, {args.sessions} sessions at {args.fps:g} fps "
+          f"({args.sessions * args.fps:.0f} frames/s offered)")
+    interval = 1.0 / (args.sessions * args.fps)
+    next_at = started = last_report = time.perf_counter()
+    frame_number = 0
+    try:
+        while time.perf_counter() - started < args.seconds:
+            session = frame_number % args.sessions
+            service.submit(f"session-{session}", scenes[session % len(scenes)])
+            frame_number += 1
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if time.perf_counter() - last_report >= args.stats_every:
+                last_report = time.perf_counter()
+                print(format_stats(service.stats()))
+        time.sleep(args.max_delay_ms / 1000 * 5)
+    finally:
+        final = service.stats()
+        service.stop()
+    print(format_stats(final))
+
+
+if __name__ == "__main__":
+    main()
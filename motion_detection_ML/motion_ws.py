@@ -0,0 +1,255 @@
+"""
+Server-side motion checks for the browser mock interview over a WebSocket.
+
+    python motion_ws.py --port 8503
+
+    GET /ws/motion?session=<id>     WebSocket: send JPEG/WebP frames as binary messages
+    GET /api/motion/stats           connections, frame counters, scoring latency
+    GET /api/health
+
+Every connection gets its own detector (by default MOG2 background subtraction, motion_backends
+"mog2": it needs no still warm-up and, in motion_benchmark.py, is the engine that catches both small
+and large moves). Frames are decoded and scored in a thread pool (OpenCV releases
+the GIL), so one event loop serves many connections. Each scored frame is answered with
+
+    {"type": "verdict", "frame": 17, "state": "monitoring", "movement_detected": false,
+     "confidence": 0.12, "position_change": {"x": 0.1, "y": -0.05},
+     "analysis": "Position OK", "interval_ms": 200}
+
+`interval_ms` is how long the client should wait before sending its next frame. It backs off
+when the server is saturated, when the connection's frames had to be dropped or when scoring
+took longer than the interval, and creeps back towards --min-interval-ms otherwise. A frame that
+arrives while the previous one is still being scored waits; if another arrives, the older one is
+dropped (latest frame wins). A text message {"type": "reset"} makes the detector forget the scene
+(and restart the warm-up, for "mean"), e.g. after the candidate moves the camera.
+
+With --audit-log, a JSON line per finished session (frames, flagged frames, drops) is appended,
+so the interview record does not depend on the browser.
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from motion_backends import BACKENDS, create_backend, describe_movement
+from motion_pipeline import StageTimer
+
+# JPEG decoding can skip detail we would throw away anyway: the detectors work at 64x64 / 80x60
+DECODE_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+class MotionSession:
+    def __init__(self, session_id, detector, interval):
+        self.session_id = session_id
+        self.detector = detector
+        self.interval = interval
+        self.started = time.time()
+        self.pending = None  # newest frame waiting behind the one being scored
+        self.busy = False
+        self.reset_requested = False
+        self.dropped_since_verdict = False
+        self.counts = {"frames": 0, "scored": 0, "dropped": 0, "flagged": 0, "undecodable": 0}
+
+    def summary(self):
+        scored = self.counts["scored"]
+        return {"session": self.session_id, "started": self.started,
+                "duration_seconds": round(time.time() - self.started, 1), **self.counts,
+                "flagged_share": round(self.counts["flagged"] / scored, 4) if scored else 0.0}
+
+
+class MotionWebSocketService:
+    def __init__(self, backend="mog2", backend_options=None, workers=8, decode_scale=2,
+                 min_interval=0.2, max_interval=2.0, audit_log=None):
+        self.backend = backend
+        self.backend_options = backend_options or {}
+        self.workers = workers
+        self.decode_flag = DECODE_FLAGS[decode_scale]
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.audit_log = audit_log
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="motion-ws")
+        self.sessions = {}
+        self.in_flight = 0
+        self.counts = {"frames": 0, "scored": 0, "dropped": 0, "undecodable": 0, "sessions_finished": 0}
+        self.scoring = StageTimer(window=2000)
+        self._audit_lock = threading.Lock()  # pool threads append whole lines, one at a time
+
+    def open_session(self, session_id):
+        session = MotionSession(session_id, create_backend(self.backend, **self.backend_options), self.min_interval)
+        self.sessions[id(session)] = session
+        return session
+
+    async def close_session(self, session):
+        self.sessions.pop(id(session), None)
+        self.counts["sessions_finished"] += 1
+        if self.audit_log:
+            # File I/O would block every connection on the loop; it goes to the pool like the scoring
+            line = json.dumps(session.summary()) + "\n"
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._append_audit, line)
+
+    def _append_audit(self, line):
+        with self._audit_lock, open(self.audit_log, "a") as f:
+            f.write(line)
+
+    def _score(self, session, data):
+        """Runs on a pool thread: decode and score one frame (None if it could not be decoded)"""
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), self.decode_flag)
+        if image is None:
+            return None
+        if session.reset_requested:
+            session.detector.reset()
+        session.reset_requested = False
+        return session.detector.detect_movement(image)
+
+    def _next_interval(self, session, took):
+        overloaded = self.in_flight >= self.workers or session.dropped_since_verdict or took > session.interval
+        if overloaded:
+            session.interval = min(session.interval * 1.5, self.max_interval)
+        else:
+            session.interval = max(session.interval * 0.9, self.min_interval)
+        session.dropped_since_verdict = False
+        return session.interval
+
+    def receive_frame(self, session, data, send):
+        """Queue a frame; starts a scoring task unless one is already running for this session"""
+        session.counts["frames"] += 1
+        self.counts["frames"] += 1
+        if not session.busy:
+            session.busy = True
+            return asyncio.ensure_future(self._score_frames(session, data, send))
+        if session.pending is not None:
+            session.counts["dropped"] += 1
+            self.counts["dropped"] += 1
+            session.dropped_since_verdict = True
+        session.pending = data
+        return None
+
+    async def _score_frames(self, session, data, send):
+        loop = asyncio.get_running_loop()
+        try:
+            while data is not None:
+                started = time.perf_counter()
+                self.in_flight += 1
+                try:
+                    prediction = await loop.run_in_executor(self.executor, self._score, session, data)
+                finally:
+                    self.in_flight -= 1
+                took = time.perf_counter() - started
+                if prediction is None:
+                    session.counts["undecodable"] += 1
+                    self.counts["undecodable"] += 1
+                    await send({"type": "error", "error": "could not decode frame as JPEG/WebP"})
+                else:
+                    self.scoring.record(took)
+                    session.counts["scored"] += 1
+                    self.counts["scored"] += 1
+                    session.counts["flagged"] += bool(prediction['movement_detected'])
+                    await send({
+                        "type": "verdict",
+                        "frame": session.counts["scored"],
+                        "state": getattr(session.detector, "state", "monitoring"),
+                        "movement_detected": bool(prediction['movement_detected']),
+                        "confidence": round(float(prediction['confidence']), 4),
+                        "position_change": {axis: round(float(value), 4)
+                                            for axis, value in prediction['position_change'].items()},
+                        "analysis": describe_movement(prediction),
+                        "interval_ms": round(self._next_interval(session, took) * 1000),
+                    })
+                data, session.pending = session.pending, None
+        finally:
+            session.busy = False
+
+    def stats(self):
+        return {"connections": len(self.sessions), "in_flight": self.in_flight, "workers": self.workers,
+                **self.counts, "scoring": self.scoring.summary()}
+
+
+def create_app(service, max_frame_bytes=1 << 20):
+    async def motion_socket(request):
+        ws = web.WebSocketResponse(heartbeat=30, max_msg_size=max_frame_bytes)
+        await ws.prepare(request)
+        session = service.open_session(request.query.get("session") or uuid.uuid4().hex)
+        tasks = set()
+
+        async def send(message):
+            if not ws.closed:
+                await ws.send_json(message)
+
+        await send({"type": "hello", "session": session.session_id,
+                    "interval_ms": round(session.interval * 1000),
+                    "warmup_frames": getattr(session.detector, "warmup_frames", 0)})
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    task = service.receive_frame(session, message.data, send)
+                    if task is not None:
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                elif message.type == WSMsgType.TEXT:
+                    try:
+                        command = json.loads(message.data)
+                    except ValueError:
+                        command = None
+                    if isinstance(command, dict) and command.get("type") == "reset":
+                        session.reset_requested = True
+                    else:
+                        await send({"type": "error", "error": 'expected binary frames or {"type": "reset"}'})
+                elif message.type == WSMsgType.ERROR:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await service.close_session(session)
+        return ws
+
+    async def stats(request):
+        return web.json_response(service.stats())
+
+    async def health(request):
+        return web.json_response({"status": "ok"})
+
+    app = web.Application()
+    app.router.add_get("/ws/motion", motion_socket)
+    app.router.add_get("/api/motion/stats", stats)
+    app.router.add_get("/api/health", health)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket motion checks for browser interviews")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOTION_WS_PORT", "8503")))
+    # cnn is left out: it needs trained weights, and a model per connection would not fit in memory
+    parser.add_argument("--backend", choices=sorted(set(BACKENDS) - {"cnn"}), default="mog2",
+                        help="see motion_backends.py")
+    parser.add_argument("--warmup-frames", type=int, default=15,
+                        help="frames that build each session's baseline (--backend mean)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="decode/score threads")
+    parser.add_argument("--decode-scale", type=int, choices=sorted(DECODE_FLAGS), default=2,
+                        help="decode JPEGs at 1/N size (frames only need to cover 80x60)")
+    parser.add_argument("--min-interval-ms", type=float, default=200, help="fastest sampling asked of clients")
+    parser.add_argument("--max-interval-ms", type=float, default=2000, help="slowest sampling under load")
+    parser.add_argument("--max-frame-kb", type=int, default=1024)
+    parser.add_argument("--audit-log", help="append a JSON line per finished session to this file")
+    args = parser.parse_args()
+
+    # The pool already runs one frame per thread; OpenCV's own threads would only oversubscribe the cores
+    cv2.setNumThreads(1)
+    options = {"warmup_frames": args.warmup_frames} if args.backend == "mean" else {}
+    service = MotionWebSocketService(args.backend, options, workers=args.workers, decode_scale=args.decode_scale,
+                                     min_interval=args.min_interval_ms / 1000,
+                                     max_interval=args.max_interval_ms / 1000, audit_log=args.audit_log)
+    web.run_app(create_app(service, max_frame_bytes=args.max_frame_kb * 1024), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
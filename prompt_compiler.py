@@ -0,0 +1,78 @@
+"""
+Prompt templates compiled once, with per-prompt token budgets.
+
+A template is split into literal text and named slots when it is defined, so rendering is a
+join instead of a fresh f-string build, and the size of the literal text is known up front.
+Slots listed in `truncate` (free user text, long documents) are cut at a word boundary so the
+whole prompt stays under `max_tokens`. Each render reports its estimated size to the metrics registry.
+"""
+import string
+
+import advisor_metrics
+
+CHARS_PER_TOKEN = 4  # Gemini averages roughly four characters per token on English text
+TRUNCATION_MARK = " [...]"
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text, max_tokens):
+    """`text` cut to about `max_tokens` tokens at a word boundary, marked as truncated"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARK)
+    if max_chars <= 0:
+        return ""
+    cut = text[:max_chars]
+    if not text[max_chars].isspace() and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + TRUNCATION_MARK
+
+
+def encode_levels(ratings, levels, items):
+    """
+    Ratings grouped by level in scale order, e.g. "No Knowledge: SQL, Statistics | Basic: Python".
+    Items keep the order of `items` (the field definition), so equal profiles give identical text.
+    """
+    groups = {}
+    for item in items:
+        if item in ratings:
+            groups.setdefault(ratings[item], []).append(item)
+    return " | ".join(f"{level}: {', '.join(groups[level])}" for level in levels if level in groups)
+
+
+class PromptTemplate:
+    def __init__(self, name, template, max_tokens=None, truncate=()):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.truncate = tuple(truncate)
+        parsed = list(string.Formatter().parse(template))
+        self._literals = [literal for literal, _, _, _ in parsed]
+        self._slots = [slot for _, slot, _, _ in parsed]
+        self.static_tokens = estimate_tokens("".join(self._literals))
+        unknown = set(self.truncate) - set(self._slots)
+        if unknown:
+            raise ValueError(f"{name}: truncatable slots not in template: {sorted(unknown)}")
+
+    def render(self, **values):
+        texts = {slot: str(values[slot]) for slot in self._slots if slot is not None}
+        truncated = []
+        if self.max_tokens is not None:
+            # Fixed slots are always kept; truncatable ones share what is left, in the order listed
+            budget = self.max_tokens - self.static_tokens - sum(
+                estimate_tokens(texts[slot]) for slot in self._slots if slot is not None and slot not in self.truncate
+            )
+            for slot in self.truncate:
+                occurrences = self._slots.count(slot)
+                allowed = max(budget, 0) // occurrences
+                if estimate_tokens(texts[slot]) > allowed:
+                    texts[slot] = truncate_to_tokens(texts[slot], allowed)
+                    truncated.append(slot)
+                budget -= estimate_tokens(texts[slot]) * occurrences
+
+        prompt = "".join(literal + (texts[slot] if slot is not None else "")
+                         for literal, slot in zip(self._literals, self._slots))
+        advisor_metrics.record_prompt(self.name, estimate_tokens(prompt), truncated)
+        return prompt
@@ -0,0 +1,188 @@
+"""
+Precomputed question pool for the detailed assessment.
+
+Questions are generated offline for every (field, experience level, weak topic) bucket and
+stored in an indexed SQLite file, so chatbot.py can sample them instantly instead of waiting
+on Gemini. Build or top up the pool with:
+
+    python question_bank.py --per-bucket 20
+    python question_bank.py --field "Data Science" --level Beginner --per-bucket 40
+"""
+import argparse
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from advisor import (CS_FIELDS, EXPERIENCE_LEVELS, JSON_GENERATION_CONFIG, MODEL_NAME, Question,
+                     build_question_prompt, parse_questions)
+
+DEFAULT_BANK_PATH = os.getenv(
+    "QUESTION_BANK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "question_bank.sqlite3"),
+)
+QUESTIONS_PER_CALL = 10
+
+
+class QuestionBank:
+    def __init__(self, path=DEFAULT_BANK_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self, create=False):
+        # Opened lazily so the app works (with every lookup missing) before the bank has been built
+        if self._db is None:
+            if not create and self.path != ":memory:" and not os.path.exists(self.path):
+                return None
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY, field TEXT NOT NULL, level TEXT NOT NULL, topic TEXT NOT NULL, "
+                "question TEXT NOT NULL, created REAL NOT NULL, UNIQUE (field, level, topic, question))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_questions_bucket ON questions (field, level, topic)")
+            self._db.commit()
+        return self._db
+
+    def add(self, field, level, topic, questions):
+        """Store Question records in a bucket, skipping exact duplicates; returns how many were new"""
+        now = time.time()
+        with self._lock:
+            db = self._connect(create=True)
+            before = db.total_changes
+            db.executemany(
+                "INSERT OR IGNORE INTO questions (field, level, topic, question, created) VALUES (?, ?, ?, ?, ?)",
+                [(field, level, topic, question.to_json(), now) for question in questions],
+            )
+            db.commit()
+            return db.total_changes - before
+
+    def count(self, field, level, topic):
+        with self._lock:
+            db = self._connect()
+            if db is None:
+                return 0
+            return db.execute(
+                "SELECT COUNT(*) FROM questions WHERE field = ? AND level = ? AND topic = ?",
+                (field, level, topic),
+            ).fetchone()[0]
+
+    def sample(self, field, level, topics, count=5, rng=random):
+        """
+        Draw `count` distinct questions spread round-robin over the given weak topics.
+        Returns an empty list when the buckets can't fill the request, so the caller falls back to the LLM.
+        """
+        with self._lock:
+            db = self._connect()
+            if db is None or not topics:
+                return []
+            pools = {}
+            for topic in topics:
+                rows = db.execute(
+                    "SELECT question FROM questions WHERE field = ? AND level = ? AND topic = ?",
+                    (field, level, topic),
+                ).fetchall()
+                pools[topic] = [Question.from_json(row[0]) for row in rows]
+
+        for pool in pools.values():
+            rng.shuffle(pool)
+
+        picked = []
+        seen = set()
+        while len(picked) < count and any(pools.values()):
+            for topic in topics:
+                pool = pools[topic]
+                while pool:
+                    question = pool.pop()
+                    if question not in seen:
+                        seen.add(question)
+                        picked.append(question)
+                        break
+                if len(picked) == count:
+                    break
+
+        return picked if len(picked) == count else []
+
+
+_shared_bank = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_bank():
+    global _shared_bank
+    with _shared_lock:
+        if _shared_bank is None:
+            _shared_bank = QuestionBank()
+        return _shared_bank
+
+
+def bucket_profile(field, level, topic):
+    """Synthetic knowledge profile used to generate questions for one bucket"""
+    field_info = CS_FIELDS[field]
+    return {
+        "overall_level": level,
+        "topic_knowledge": {t: ("No Knowledge" if t == topic else "Basic") for t in field_info["topics"]},
+        "prereq_knowledge": {p: "Basic" for p in field_info["prerequisites"]},
+        "additional_info": "",
+    }
+
+
+def fill_bucket(model, bank, field, level, topic, per_bucket, max_calls=10):
+    """Generate questions until the bucket holds `per_bucket` of them (or `max_calls` calls were spent)"""
+    calls = 0
+    while calls < max_calls:
+        missing = per_bucket - bank.count(field, level, topic)
+        if missing <= 0:
+            break
+        prompt = build_question_prompt(
+            field, bucket_profile(field, level, topic),
+            count=min(missing, QUESTIONS_PER_CALL), focus_topic=topic,
+        )
+        response = model.generate_content(prompt, generation_config=JSON_GENERATION_CONFIG)
+        bank.add(field, level, topic, parse_questions(response.text))
+        calls += 1
+    return bank.count(field, level, topic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate the assessment question bank")
+    parser.add_argument("--per-bucket", type=int, default=20, help="questions to keep per (field, level, topic)")
+    parser.add_argument("--field", choices=list(CS_FIELDS), help="only fill this field")
+    parser.add_argument("--level", choices=EXPERIENCE_LEVELS, help="only fill this experience level")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent Gemini requests")
+    parser.add_argument("--path", default=DEFAULT_BANK_PATH, help="bank file to write")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    import google.generativeai as gen_ai
+
+    load_dotenv()
+    gen_ai.configure(api_key=os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+    model = gen_ai.GenerativeModel(MODEL_NAME)
+    bank = QuestionBank(args.path)
+
+    buckets = [
+        (field, level, topic)
+        for field in ([args.field] if args.field else CS_FIELDS)
+        for level in ([args.level] if args.level else EXPERIENCE_LEVELS)
+        for topic in CS_FIELDS[field]["topics"]
+    ]
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(fill_bucket, model, bank, *bucket, args.per_bucket): bucket for bucket in buckets}
+        for done, future in enumerate(as_completed(futures), 1):
+            field, level, topic = futures[future]
+            try:
+                size = future.result()
+                print(f"[{done}/{len(buckets)}] {field} / {level} / {topic}: {size} questions")
+            except Exception as e:
+                print(f"[{done}/{len(buckets)}] {field} / {level} / {topic}: failed ({e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Local quiz engine over curated MCQ banks such as quiz.txt.
+
+Bank files are split into sections by headers like "🔹 Beginner-Level DSA MCQs": the level gives
+each question's difficulty and the rest its topic. Each section lists question blocks
+("text" followed by "a) ...".."d) ...") and then an answers block, one "b) ..." line per question.
+
+Scoring is local, and the learner's ability is estimated on a Rasch (1-parameter IRT) scale
+with Elo-style updates. Questions are then picked where they are most informative, i.e. where
+the learner has roughly even odds.
+"""
+import math
+import os
+import random
+import re
+import threading
+from collections import defaultdict
+
+from advisor import Question
+
+DEFAULT_QUIZ_PATHS = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "quiz.txt")]
+
+# Item difficulty and starting learner ability on the same logit scale
+DIFFICULTY_LOGITS = {"Beginner": -1.0, "Intermediate": 0.0, "Advanced": 1.0, "Expert": 2.0}
+LEVEL_PRIOR_LOGITS = {"Complete Beginner": -1.5, "Beginner": -0.75, "Intermediate": 0.25, "Advanced": 1.0}
+ELO_K = 0.6
+# Items further than this from the learner's starting ability are not served; a level the bank has
+# nothing for falls through to the question bank or the LLM instead
+MAX_LEVEL_GAP = 0.75
+
+# Which bank topics can stand in for generated questions in each advisor field
+FIELD_QUIZ_TOPICS = {
+    "Web Development": ("Full Stack", "DSA"),
+}
+
+SECTION_HEADER = re.compile(r"(Beginner|Intermediate|Advanced|Expert)-Level\s+(.+?)\s+MCQs", re.IGNORECASE)
+OPTION_LINE = re.compile(r"^([a-dA-D])\)\s*(.+)$")
+
+
+def parse_quiz_text(text, source="quiz"):
+    """Parse a bank file's text into Question records (with topic and difficulty set)"""
+    questions = []
+    topic = difficulty = None
+    section = []  # [question text, [options]] pairs
+    answer_letters = []
+    in_answers = False
+
+    def close_section():
+        if topic is None:
+            return
+        if len(answer_letters) != len(section):
+            raise ValueError(f"{source}: {topic} section has {len(section)} questions "
+                             f"but {len(answer_letters)} answers")
+        for (text_, options), letter in zip(section, answer_letters):
+            questions.append(Question(text_, tuple(options), "abcd".index(letter), topic, difficulty))
+
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        header = SECTION_HEADER.search(line)
+        if header:
+            close_section()
+            difficulty, topic = header.group(1).capitalize(), header.group(2).strip()
+            section, answer_letters, in_answers = [], [], False
+            continue
+        if line.startswith("✅"):
+            in_answers = "answer" in line.lower()
+            continue
+        option = OPTION_LINE.match(line)
+        if in_answers:
+            if option:
+                answer_letters.append(option.group(1).lower())
+        elif option and section:
+            section[-1][1].append(option.group(2).strip())
+        elif not option:
+            section.append([line, []])
+
+    close_section()
+    return questions
+
+
+class QuizBank:
+    """Questions indexed by topic and difficulty"""
+
+    def __init__(self, questions=()):
+        self.questions = []
+        self.by_topic = defaultdict(list)
+        self.by_difficulty = defaultdict(list)
+        for question in questions:
+            self.add(question)
+
+    def add(self, question):
+        index = len(self.questions)
+        self.questions.append(question)
+        self.by_topic[question.topic].append(index)
+        self.by_difficulty[question.difficulty].append(index)
+
+    @classmethod
+    def load(cls, paths=None):
+        bank = cls()
+        for path in paths or DEFAULT_QUIZ_PATHS:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for question in parse_quiz_text(f.read(), source=os.path.basename(path)):
+                        bank.add(question)
+        return bank
+
+    def covers(self, field):
+        return any(self.by_topic.get(topic) for topic in FIELD_QUIZ_TOPICS.get(field, ()))
+
+    def select(self, ability, topics, count=5, exclude=(), max_gap=None, rng=random):
+        """
+        Pick up to `count` unseen questions from `topics`, taking turns between topics and within
+        each topic preferring the item whose difficulty is closest to the current ability estimate.
+        Equally close items come in random order, and items more than `max_gap` logits away are skipped.
+        """
+        excluded = set(exclude)
+        candidates = {}
+        for topic in topics:
+            items = [i for i in self.by_topic.get(topic, ()) if self.questions[i].text not in excluded
+                     and (max_gap is None or abs(item_difficulty(self.questions[i]) - ability) <= max_gap)]
+            rng.shuffle(items)  # the sort is stable, so this breaks ties randomly
+            candidates[topic] = sorted(items, key=lambda i: abs(item_difficulty(self.questions[i]) - ability))
+        picked = []
+        while len(picked) < count and any(candidates.values()):
+            for topic in topics:
+                if candidates[topic] and len(picked) < count:
+                    picked.append(self.questions[candidates[topic].pop(0)])
+        return picked
+
+    def select_next(self, ability, topics, exclude=()):
+        """Most informative single next question (for one-at-a-time adaptive quizzes)"""
+        picked = self.select(ability, topics, count=len(topics), exclude=exclude)
+        return max(picked, key=lambda q: information(ability, item_difficulty(q)), default=None)
+
+    def sample_for(self, field, overall_level, count=5, exclude=(), rng=random):
+        """
+        `count` questions for a field's assessment near the self-reported level, skipping `exclude`
+        (texts already asked, e.g. on a retake). [] if the bank can't fill the whole quiz at that level,
+        so the caller falls back to other sources rather than serving off-level or repeated items.
+        """
+        if not self.covers(field):
+            return []
+        picked = self.select(LEVEL_PRIOR_LOGITS.get(overall_level, 0.0), FIELD_QUIZ_TOPICS[field], count,
+                             exclude=exclude, max_gap=MAX_LEVEL_GAP, rng=rng)
+        return picked if len(picked) == count else []
+
+
+def item_difficulty(question, default=0.0):
+    return DIFFICULTY_LOGITS.get(question.difficulty, default)
+
+
+def p_correct(ability, difficulty):
+    return 1.0 / (1.0 + math.exp(difficulty - ability))
+
+
+def information(ability, difficulty):
+    p = p_correct(ability, difficulty)
+    return p * (1 - p)
+
+
+def update_ability(ability, difficulty, correct, k=ELO_K):
+    return ability + k * ((1.0 if correct else 0.0) - p_correct(ability, difficulty))
+
+
+def score_answers(answers, overall_level):
+    """
+    Compact score vector for answers of the form {"question", "choice", "correct", "topic", "difficulty"}:
+    totals, per-topic (correct, scored) and an ability estimate starting from the self-reported level.
+    Items without a known difficulty are treated as pitched at that level.
+    """
+    prior = LEVEL_PRIOR_LOGITS.get(overall_level, 0.0)
+    ability = prior
+    by_topic = {}
+    correct = scored = 0
+    for answer in answers.values():
+        result = answer.get("correct")
+        if result is None:
+            continue
+        scored += 1
+        correct += bool(result)
+        topic = answer.get("topic") or "General"
+        topic_correct, topic_scored = by_topic.get(topic, (0, 0))
+        by_topic[topic] = (topic_correct + bool(result), topic_scored + 1)
+        difficulty = DIFFICULTY_LOGITS.get(answer.get("difficulty"), prior)
+        ability = update_ability(ability, difficulty, result)
+    return {"correct": correct, "scored": scored, "by_topic": by_topic, "ability": round(ability, 2)}
+
+
+_shared_quiz = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_quiz():
+    global _shared_quiz
+    with _shared_lock:
+        if _shared_quiz is None:
+            _shared_quiz = QuizBank.load()
+        return _shared_quiz
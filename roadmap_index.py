@@ -0,0 +1,182 @@
+"""
+Nearest-neighbour reuse of generated roadmaps.
+
+Knowledge profiles are ordinal, so they are encoded as vectors of slider notches: overall
+experience, each topic and prerequisite level, and the assessment ability estimate in logits.
+Generated roadmaps are stored with their profile vector (SQLite on disk, one NumPy matrix per
+field in memory). A new profile within `max_distance` of a stored one is served that roadmap,
+so profiles one notch apart share an entry where exact-match caching would miss. With the
+default Euclidean metric a distance of 1.0 is one slider notch.
+
+Profiles with background text are only matched against profiles with the same text.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from advisor import CS_FIELDS, EXPERIENCE_LEVELS, KNOWLEDGE_LEVELS
+from llm_cache import fingerprint, normalize_prompt
+from quiz_engine import LEVEL_PRIOR_LOGITS
+
+DEFAULT_INDEX_PATH = os.getenv(
+    "ROADMAP_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "roadmap_index.sqlite3"),
+)
+DEFAULT_MAX_DISTANCE = float(os.getenv("ROADMAP_REUSE_DISTANCE", "1.0"))
+DEFAULT_METRIC = os.getenv("ROADMAP_REUSE_METRIC", "euclidean")
+DEFAULT_MAX_ENTRIES = 2000  # per bucket
+
+METRICS = {
+    "euclidean": lambda diff: np.sqrt(np.einsum("ij,ij->i", diff, diff)),
+    "manhattan": lambda diff: np.abs(diff).sum(axis=1),
+    "chebyshev": lambda diff: np.abs(diff).max(axis=1),
+}
+
+
+def profile_labels(field):
+    """Names of the vector dimensions for a field"""
+    info = CS_FIELDS[field]
+    return ["Overall Experience"] + info["topics"] + info["prerequisites"] + ["Assessment ability"]
+
+
+def encode_profile(field, knowledge, score=None):
+    info = CS_FIELDS[field]
+    ability = score["ability"] if score else LEVEL_PRIOR_LOGITS.get(knowledge["overall_level"], 0.0)
+    return np.array(
+        [EXPERIENCE_LEVELS.index(knowledge["overall_level"])]
+        + [KNOWLEDGE_LEVELS.index(knowledge["topic_knowledge"].get(topic, KNOWLEDGE_LEVELS[0]))
+           for topic in info["topics"]]
+        + [KNOWLEDGE_LEVELS.index(knowledge["prereq_knowledge"].get(prereq, KNOWLEDGE_LEVELS[0]))
+           for prereq in info["prerequisites"]]
+        + [ability],
+        dtype=np.float32,
+    )
+
+
+def describe_differences(field, stored, vector):
+    """Human-readable changes from a stored profile vector to `vector`, e.g. "SQL: Basic -> Intermediate" """
+    labels = profile_labels(field)
+    changes = []
+    for position, (before, after) in enumerate(zip(stored, vector)):
+        if before == after:
+            continue
+        if position == len(labels) - 1:
+            if abs(after - before) >= 0.25:
+                changes.append(f"{labels[position]}: {before:+.2f} -> {after:+.2f} logits")
+            continue
+        scale = EXPERIENCE_LEVELS if position == 0 else KNOWLEDGE_LEVELS
+        changes.append(f"{labels[position]}: {scale[int(before)]} -> {scale[int(after)]}")
+    return changes
+
+
+def bucket_key(field, knowledge):
+    return fingerprint(field, normalize_prompt(knowledge.get("additional_info") or ""))
+
+
+class Match(NamedTuple):
+    distance: float
+    roadmap: str
+    vector: np.ndarray
+
+
+class RoadmapIndex:
+    def __init__(self, path=DEFAULT_INDEX_PATH, max_distance=DEFAULT_MAX_DISTANCE, metric=DEFAULT_METRIC,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        if metric not in METRICS:
+            raise ValueError(f"unknown metric {metric!r}, expected one of {sorted(METRICS)}")
+        self.max_distance = max_distance
+        self.metric = metric
+        self.max_entries = max_entries
+        self._distance = METRICS[metric]
+        self._buckets = {}  # bucket key -> [vectors matrix, roadmaps list]
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS roadmaps ("
+            "id INTEGER PRIMARY KEY, bucket TEXT NOT NULL, vector BLOB NOT NULL, roadmap TEXT NOT NULL, "
+            "created REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_roadmaps_bucket ON roadmaps (bucket, id)")
+        self._db.commit()
+
+    def _bucket(self, key, dim):
+        # Loaded from disk the first time a bucket is touched in this process
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rows = self._db.execute(
+                "SELECT vector, roadmap FROM roadmaps WHERE bucket = ? ORDER BY id DESC LIMIT ?",
+                (key, self.max_entries),
+            ).fetchall()[::-1]
+            vectors = [np.frombuffer(vector, dtype=np.float32) for vector, _ in rows]
+            vectors = np.vstack(vectors) if vectors else np.empty((0, dim), dtype=np.float32)
+            bucket = self._buckets[key] = [vectors, [roadmap for _, roadmap in rows]]
+        return bucket
+
+    def _nearest(self, bucket, vector):
+        vectors, roadmaps = bucket
+        if not len(roadmaps):
+            return None
+        distances = self._distance(vectors - vector)
+        best = int(np.argmin(distances))
+        return Match(float(distances[best]), roadmaps[best], vectors[best])
+
+    def nearest(self, field, knowledge, score=None):
+        """Closest stored roadmap within max_distance, or None"""
+        vector = encode_profile(field, knowledge, score)
+        with self._lock:
+            match = self._nearest(self._bucket(bucket_key(field, knowledge), len(vector)), vector)
+            if match is None or match.distance > self.max_distance:
+                self._stats["misses"] += 1
+                return None
+            self._stats["exact_hits" if match.distance == 0 else "near_hits"] += 1
+            return match
+
+    def add(self, field, knowledge, roadmap, score=None):
+        vector = encode_profile(field, knowledge, score)
+        key = bucket_key(field, knowledge)
+        with self._lock:
+            bucket = self._bucket(key, len(vector))
+            match = self._nearest(bucket, vector)
+            if match is not None and match.distance == 0:
+                return
+            bucket[0] = np.vstack([bucket[0], vector])[-self.max_entries:]
+            bucket[1] = (bucket[1] + [roadmap])[-self.max_entries:]
+            self._db.execute(
+                "INSERT INTO roadmaps (bucket, vector, roadmap, created) VALUES (?, ?, ?, ?)",
+                (key, vector.tobytes(), roadmap, time.time()),
+            )
+            self._db.execute(
+                "DELETE FROM roadmaps WHERE bucket = ? AND id NOT IN "
+                "(SELECT id FROM roadmaps WHERE bucket = ? ORDER BY id DESC LIMIT ?)",
+                (key, key, self.max_entries),
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._db.execute("SELECT COUNT(*) FROM roadmaps").fetchone()[0]
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["near_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+_shared_index = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_index():
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = RoadmapIndex()
+        return _shared_index
@@ -0,0 +1,124 @@
+"""
+Persistent advisor sessions, so a returning user lands back on their stage (and roadmap)
+instead of paying for every LLM call again.
+
+Snapshots are zlib-compressed JSON rows in SQLite keyed by session id, optionally tagged with a
+user id so a signed-in user can resume their latest session. The user id must come from an
+authenticated identity: anyone holding it can load the user's answers and roadmap.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+
+from advisor import Question
+
+DEFAULT_SESSION_PATH = os.getenv(
+    "ADVISOR_SESSION_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sessions.sqlite3"),
+)
+DEFAULT_MAX_AGE_SECONDS = 90 * 24 * 3600
+
+# Session state keys that make up a resumable session
+SNAPSHOT_KEYS = ("stage", "chosen_field", "current_knowledge", "assessment_questions", "answers",
+                 "roadmap", "additional_courses", "roadmap_timing", "seen_questions")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def encode_snapshot(state):
+    snapshot = {key: state.get(key) for key in SNAPSHOT_KEYS}
+    snapshot["assessment_questions"] = [question._asdict() for question in snapshot["assessment_questions"] or []]
+    return zlib.compress(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_snapshot(blob):
+    snapshot = json.loads(zlib.decompress(blob).decode("utf-8"))
+    snapshot["assessment_questions"] = [
+        Question(item["text"], tuple(item["options"]), item.get("answer"), item.get("topic"),
+                 item.get("difficulty"))
+        for item in snapshot.get("assessment_questions") or []
+    ]
+    # JSON object keys are strings; the app indexes answers by question number
+    snapshot["answers"] = {int(idx): answer for idx, answer in (snapshot.get("answers") or {}).items()}
+    # Question texts already asked, so retakes after a resume don't repeat them (absent in older snapshots)
+    snapshot["seen_questions"] = list(snapshot.get("seen_questions") or [])
+    return snapshot
+
+
+class SessionStore:
+    def __init__(self, path=DEFAULT_SESSION_PATH, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, user_id TEXT, stage TEXT NOT NULL, snapshot BLOB NOT NULL, "
+            "updated REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id, updated)")
+        self._db.commit()
+
+    def save(self, session_id, state, user_id=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, user_id, stage, snapshot, updated) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (session_id) DO UPDATE SET user_id = COALESCE(excluded.user_id, user_id), "
+                "stage = excluded.stage, snapshot = excluded.snapshot, updated = excluded.updated",
+                (session_id, user_id, state.get("stage", "choose_field"), encode_snapshot(state), time.time()),
+            )
+            self._db.commit()
+
+    def load(self, session_id):
+        """Snapshot dict for `session_id`, or None if unknown or expired"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT snapshot, updated FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.max_age:
+            return None
+        return decode_snapshot(row[0])
+
+    def latest_for_user(self, user_id):
+        """(session_id, snapshot) of the user's most recently saved session, or (None, None); `user_id` must be authenticated"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT session_id, snapshot, updated FROM sessions WHERE user_id = ? ORDER BY updated DESC LIMIT 1",
+                (user_id,),
+            ).fetchone()
+        if row is None or time.time() - row[2] > self.max_age:
+            return None, None
+        return row[0], decode_snapshot(row[1])
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def prune(self):
+        with self._lock:
+            cur = self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.max_age,))
+            self._db.commit()
+            return cur.rowcount
+
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_store():
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = SessionStore()
+            _shared_store.prune()
+        return _shared_store